@@ -2,18 +2,34 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+import base64
+import hashlib
 import json
+import os
+import sqlite3
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, jsonify, make_response
 from flask_moment import Moment
 from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
+import click
+import time
+from flask.cli import AppGroup
 from flask_wtf import Form
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.engine import Engine
+from werkzeug.http import is_resource_modified
 from forms import *
-from datetime import date
+from assets import Assets
+from cache import Cache
+from instrumentation import SQLInstrumentation
+from pooling import PooledSQLAlchemy, pool_status
+import bulk
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import groupby
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
@@ -21,17 +37,73 @@ from datetime import date
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
-db = SQLAlchemy(app)
+if os.environ.get('FYYUR_CONFIG'):
+  app.config.from_object(os.environ['FYYUR_CONFIG'])
+if app.config.get('TEMPLATE_BYTECODE_CACHE_DIR'):
+  app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_BYTECODE_CACHE_DIR'])
+db = PooledSQLAlchemy(app)
 migrate = Migrate(app, db)
+cache = Cache(app)
+SQLInstrumentation(app)
+static_assets = Assets(app)
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
+class UTCDateTime(db.TypeDecorator):
+  '''
+  Timezone-aware timestamp that always binds and loads UTC datetimes.
+  Naive values are taken to be UTC, which also keeps SQLite (which has no
+  timezone support) comparable with the aware values Postgres returns.
+  '''
+  impl = db.DateTime(timezone=True)
+  cache_ok = True
+
+  def process_bind_param(self, value, dialect):
+    if value is None:
+      return value
+    if value.tzinfo is None:
+      value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+  def process_result_value(self, value, dialect):
+    if value is not None and value.tzinfo is None:
+      value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def utcnow():
+  return datetime.now(timezone.utc)
+
+class Genre(db.Model):
+    __tablename__ = 'genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+# Listings filtered by genre probe the link tables by genre first, hence the
+# (genre_id, <entity>_id) indexes next to the primary keys.
+venue_genre = db.Table('venue_genre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Index('ix_venue_genre_genre_id_venue_id', 'genre_id', 'venue_id')
+)
+
+artist_genre = db.Table('artist_genre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Index('ix_artist_genre_genre_id_artist_id', 'genre_id', 'artist_id')
+)
+
 class Venue(db.Model):
     __tablename__ = 'venue'
+    __table_args__ = (
+        db.Index('ix_venue_name_trgm', 'name',
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_venue_state_city_id', 'state', 'city', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=venue_genre, lazy=True)
     address = db.Column(db.String(120), nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
@@ -41,14 +113,23 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean(), default=True)
     seeking_description = db.Column(db.String(120), nullable=True)
     image_link = db.Column(db.String(500), nullable=True)
-    shows_venue = db.relationship('Show', backref='venue', lazy=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(UTCDateTime(), nullable=False, default=utcnow, onupdate=utcnow,
+        server_default=db.func.now())
+    shows_venue = db.relationship('Show', backref='venue', lazy=True, passive_deletes=True)
 
 class Artist(db.Model):
     __tablename__ = 'artist'
+    __table_args__ = (
+        db.Index('ix_artist_name_trgm', 'name',
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_artist_name_id', 'name', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
-    genres = db.Column(db.String(120), nullable=False)
+    genres = db.relationship('Genre', secondary=artist_genre, lazy=True)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120), nullable=False)
@@ -57,28 +138,519 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean(), default=True)
     seeking_description = db.Column(db.String(120), nullable=True)
     image_link = db.Column(db.String(500), nullable=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(UTCDateTime(), nullable=False, default=utcnow, onupdate=utcnow,
+        server_default=db.func.now())
     shows_artist = db.relationship('Show', backref='artist', lazy=True)
 
 class Show(db.Model):
   __tablename__ = 'show'
+  __table_args__ = (
+    db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_show_start_time_id', 'start_time', 'id'),
+    # Only the shows the rollover job still has to visit.
+    db.Index('ix_show_upcoming_start_time', 'start_time',
+      postgresql_where=db.text('is_upcoming'), sqlite_where=db.text('is_upcoming')),
+  )
   id = db.Column(db.Integer(), primary_key=True)
-  venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'))
+  venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'))
   artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'))
-  start_time = db.Column(db.String(120), nullable=False)
+  start_time = db.Column(UTCDateTime(), nullable=False)
+  # Whether the show is still counted in its venue's and artist's
+  # upcoming_shows_count; cleared by the rollover job once it has started.
+  is_upcoming = db.Column(db.Boolean(), nullable=False, default=False, server_default=db.false())
+
+def is_upcoming(start_time, now=None):
+  if start_time.tzinfo is None:
+    start_time = start_time.replace(tzinfo=timezone.utc)
+  return start_time > (now or datetime.now(timezone.utc))
+
+def adjust_upcoming_counts(connection, venue_id, artist_id, delta):
+  for table, id in ((Venue.__table__, venue_id), (Artist.__table__, artist_id)):
+    connection.execute(table.update().where(table.c.id == id)
+      .values(upcoming_shows_count=table.c.upcoming_shows_count + delta))
+
+@db.event.listens_for(Show, 'before_insert')
+def flag_upcoming_show(mapper, connection, show):
+  show.is_upcoming = is_upcoming(show.start_time)
+
+@db.event.listens_for(Show, 'after_insert')
+def count_upcoming_show(mapper, connection, show):
+  # Same transaction as the INSERT, so the counters never drift from the
+  # flags. Core bulk loads bypass this and call rebuild_upcoming_counts().
+  # Past shows change both pages too, so they still bump updated_at.
+  adjust_upcoming_counts(connection, show.venue_id, show.artist_id, 1 if show.is_upcoming else 0)
+
+@db.event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+  # SQLite ignores foreign keys, and so ON DELETE CASCADE, unless asked.
+  if isinstance(dbapi_connection, sqlite3.Connection):
+    dbapi_connection.execute('PRAGMA foreign_keys=ON')
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma"
+}
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format):
+  '''
+  Parsed Babel pattern for a named ('full', 'medium') or literal format,
+  built once per format instead of on every call.
+  '''
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format))
+
+@lru_cache(maxsize=None)
+def datetime_locale(locale):
+  return babel.Locale.parse(locale)
+
+@lru_cache(maxsize=4096)
+def cached_format_datetime(value, format, locale):
+  if isinstance(value, datetime):
+    date = value
+  else:
+    date = dateutil.parser.parse(value)
+  if date.tzinfo is None:
+    date = date.replace(tzinfo=timezone.utc)
+  return datetime_pattern(format).apply(date.astimezone(timezone.utc), datetime_locale(locale))
+
+def format_datetime(value, format='medium', locale=None):
+  '''
+  The `datetime` template filter. Show lists render the same few start
+  times over and over, so results are memoized per (value, format, locale)
+  in a bounded LRU; `locale` defaults to the DATETIME_LOCALE setting.
+  '''
+  return cached_format_datetime(value, format, locale or app.config['DATETIME_LOCALE'])
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+def page_size():
+  '''
+  Page size requested with ?limit=, clamped to MAX_PAGE_SIZE.
+  '''
+  limit = request.args.get('limit', app.config['PAGE_SIZE'], type=int)
+  return max(1, min(limit, app.config['MAX_PAGE_SIZE']))
+
+def encode_cursor(values):
+  values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+  return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor, keys):
+  '''
+  The key values encode_cursor() wrote into `cursor`, aborting with 400
+  unless it holds a list with a value of each key's type.
+  '''
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(values, list) or len(values) != len(keys):
+      raise ValueError(cursor)
+    decoded = []
+    for key, value in zip(keys, values):
+      if isinstance(key.type, UTCDateTime):
+        value = datetime.fromisoformat(value)
+      elif type(value) is not key.type.python_type:
+        raise ValueError(cursor)
+      decoded.append(value)
+    return decoded
+  except (ValueError, TypeError):
+    abort(400)
+
+def keyset_page(query, keys, after, limit):
+  '''
+  Seeks past the cursor `after` in `keys` order and returns up to `limit`
+  rows plus the cursor of the next page (None on the last page). The keys
+  must be unique together and covered by an index, so every page is a
+  range scan no matter how deep it is.
+  '''
+  if after:
+    query = query.filter(db.tuple_(*keys) > db.tuple_(*[
+      db.literal(value, type_=key.type) for key, value in zip(keys, decode_cursor(after, keys))]))
+  rows = query.order_by(*keys).limit(limit + 1).all()
+  if len(rows) <= limit:
+    return rows, None
+  rows = rows[:limit]
+  return rows, encode_cursor([getattr(rows[-1], key.key) for key in keys])
+
+def genres_named(names):
+  '''
+  Genre rows for the given names, creating the ones that don't exist yet.
+  '''
+  names = set(names)
+  genres = Genre.query.filter(Genre.name.in_(names)).all() if names else []
+  for name in names - set(genre.name for genre in genres):
+    genre = Genre(name=name)
+    db.session.add(genre)
+    genres.append(genre)
+  return genres
+
+def with_genre(query, link_key, entity_key, genre):
+  '''
+  Restricts `query` to entities linked to the genre named `genre`. The
+  genre id comes from the unique name index and the link table is probed
+  through its (genre_id, <entity>_id) index, so no genre lists are decoded.
+  '''
+  if not genre:
+    return query
+  genre_id = db.session.query(Genre.id).filter_by(name=genre).scalar_subquery()
+  return query.join(link_key.table, link_key == entity_key)\
+    .filter(link_key.table.c.genre_id == genre_id)
+
+def venue_areas(after=None, limit=None, genre=None):
+  '''
+  Builds one page of the city -> venues -> num_upcoming_shows tree for the
+  venues page in a single round-trip, reading the precomputed
+  upcoming_shows_count instead of counting shows per venue.
+  '''
+  query = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state,
+      Venue.upcoming_shows_count.label("num_upcoming_shows"))
+  query = with_genre(query, venue_genre.c.venue_id, Venue.id, genre)
+  rows, next_cursor = keyset_page(query, (Venue.state, Venue.city, Venue.id),
+    after, limit or app.config['PAGE_SIZE'])
+
+  areas = []
+  for (city, state), venues in groupby(rows, key=lambda row: (row.city, row.state)):
+    areas.append({
+      "city": city,
+      "state": state,
+      "venues": [{
+        "id": venue.id,
+        "name": venue.name,
+        "num_upcoming_shows": venue.num_upcoming_shows
+      } for venue in venues]
+    })
+  return areas, next_cursor
+
+def artist_page(after=None, limit=None, genre=None):
+  '''
+  One page of the artists listing, ordered by name.
+  '''
+  query = with_genre(db.session.query(Artist.id, Artist.name),
+    artist_genre.c.artist_id, Artist.id, genre)
+  rows, next_cursor = keyset_page(query, (Artist.name, Artist.id),
+    after, limit or app.config['PAGE_SIZE'])
+  return [{"id": row.id, "name": row.name} for row in rows], next_cursor
+
+def show_page(after=None, limit=None):
+  '''
+  One page of the shows listing, ordered by start time, with venue and
+  artist columns joined into the same query.
+  '''
+  query = db.session.query(Show.id, Show.start_time, Show.venue_id,
+      Venue.name.label("venue_name"), Show.artist_id,
+      Artist.name.label("artist_name"), Artist.image_link.label("artist_image_link"))\
+    .join(Venue, Show.venue_id == Venue.id)\
+    .join(Artist, Show.artist_id == Artist.id)
+  rows, next_cursor = keyset_page(query, (Show.start_time, Show.id),
+    after, limit or app.config['PAGE_SIZE'])
+  return [{
+    "venue_id": row.venue_id,
+    "venue_name": row.venue_name,
+    "artist_id": row.artist_id,
+    "artist_name": row.artist_name,
+    "artist_image_link": row.artist_image_link,
+    "start_time": row.start_time
+  } for row in rows], next_cursor
+
+def search_by_name(model, search_term):
+  '''
+  Case-insensitive substring search on `model.name`, run in the database
+  together with the upcoming show count. On Postgres the ILIKE is served
+  by the pg_trgm GIN index on name; SQLite compiles it to a LIKE on
+  lower(name), which keeps tests working without the extension.
+  '''
+  if not search_term:
+    return []
+  pattern = "%" + search_term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+  rows = db.session.query(model.id, model.name,
+      model.upcoming_shows_count.label("num_upcoming_shows"))\
+    .filter(model.name.ilike(pattern, escape="\\"))\
+    .order_by(model.name, model.id)\
+    .all()
+  return [{
+    "id": row.id,
+    "name": row.name,
+    "num_upcoming_shows": row.num_upcoming_shows
+  } for row in rows]
+
+def venue_cache_keys(*venue_ids):
+  '''
+  Cache keys of every page showing data about the venues: their own pages,
+  the city and show listings and the pages of artists with shows there.
+  '''
+  artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id.in_(venue_ids)).distinct()
+  return ['venue:%s' % venue_id for venue_id in venue_ids] + ['venues', 'shows'] +\
+    ['artist:%s' % artist_id for artist_id, in artist_ids]
+
+def artist_cache_keys(artist_id):
+  '''
+  Cache keys of every page showing data about an artist: its own page, the
+  show listing and the pages of venues it has shows at.
+  '''
+  venue_ids = db.session.query(Show.venue_id).filter_by(artist_id=artist_id).distinct()
+  return ['artist:%s' % artist_id, 'shows'] + ['venue:%s' % venue_id for venue_id, in venue_ids]
+
+def subtract_upcoming_counts(shows):
+  '''
+  Takes the upcoming shows matched by the `shows` condition off their
+  venues' and artists' counters, one grouped UPDATE per table, and clears
+  their is_upcoming flags. The shows are locked first, in id order, so a
+  concurrent rollover and venue deletion can't both subtract the same
+  show: the second waits, and its counter updates then see the flags the
+  first cleared.
+  '''
+  shows = db.and_(Show.is_upcoming, shows)
+  db.session.query(Show.id).filter(shows).order_by(Show.id).with_for_update().all()
+  for model, key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    counted = db.select([db.func.count(Show.id)]).where(db.and_(shows, key == model.id)).scalar_subquery()
+    model.query.filter(model.id.in_(db.select([key]).where(shows)))\
+      .update({model.upcoming_shows_count: model.upcoming_shows_count - counted},
+        synchronize_session=False)
+  return Show.query.filter(shows).update({Show.is_upcoming: False}, synchronize_session=False)
+
+def roll_over_upcoming_counts(now=None):
+  '''
+  Periodic job: shows that have started since the last run stop counting
+  as upcoming. Only flagged shows are visited, through the partial
+  ix_show_upcoming_start_time index. Returns the ids of the venues and
+  artists whose counters changed.
+  '''
+  passed = db.and_(Show.is_upcoming, Show.start_time <= (now or datetime.now(timezone.utc)))
+  pairs = db.session.query(Show.venue_id, Show.artist_id).filter(passed).distinct().all()
+  if pairs:
+    subtract_upcoming_counts(passed)
+  db.session.commit()
+  return set(venue_id for venue_id, _ in pairs), set(artist_id for _, artist_id in pairs)
+
+def rebuild_upcoming_counts(now=None):
+  '''
+  Recomputes every is_upcoming flag and counter from the shows themselves,
+  for after bulk loads (which skip the insert hooks) or to repair drift.
+  '''
+  now = now or datetime.now(timezone.utc)
+  Show.query.update({Show.is_upcoming: Show.start_time > now}, synchronize_session=False)
+  for model, key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    counted = db.select([db.func.count(Show.id)]).where(db.and_(Show.is_upcoming, key == model.id)).scalar_subquery()
+    model.query.update({model.upcoming_shows_count: counted}, synchronize_session=False)
+  db.session.commit()
+
+def delete_venues(venue_ids, chunk_size=None):
+  '''
+  Deletes venues by id, `chunk_size` venues per transaction so a large
+  deletion never holds its row locks for long. Each chunk takes its
+  upcoming shows off the artists' counters and deletes the venues, whose
+  shows and genre links go with them through ON DELETE CASCADE. Returns
+  the number of venues deleted.
+  '''
+  deleted = 0
+  # Sorted ids lock rows in the same order as concurrent deletions.
+  for chunk in bulk.batched(sorted(set(venue_ids)), chunk_size or app.config['DELETE_CHUNK_SIZE']):
+    try:
+      stale_keys = venue_cache_keys(*chunk)
+      subtract_upcoming_counts(Show.venue_id.in_(chunk))
+      deleted += Venue.query.filter(Venue.id.in_(chunk)).delete(synchronize_session=False)
+      db.session.commit()
+    except:
+      db.session.rollback()
+      raise
+    cache.delete(*stale_keys)
+  return deleted
+
+# Columns the edit forms can change, besides genres.
+VENUE_EDIT_FIELDS = ('name', 'address', 'city', 'state', 'phone', 'facebook_link')
+ARTIST_EDIT_FIELDS = ('name', 'city', 'state', 'phone', 'facebook_link')
+
+def edit_form_data(entity, fields):
+  '''
+  Initial data for an edit form: the entity's current values, plus its
+  version and a JSON snapshot of those values in hidden fields.
+  '''
+  snapshot = dict((field, getattr(entity, field)) for field in fields)
+  snapshot['genres'] = sorted(genre.name for genre in entity.genres)
+  return dict(snapshot, version=entity.version, snapshot=json.dumps(snapshot))
+
+def save_edit(model, link_key, entity_id, fields):
+  '''
+  Writes the submitted edit form with a single UPDATE of the columns that
+  differ from the form's snapshot, guarded by the version it was rendered
+  with, and only rewrites the genre links if they were submitted and
+  changed. Returns one of 'updated', 'unchanged', 'missing' or 'conflict'
+  (edited since).
+  '''
+  try:
+    snapshot = json.loads(request.form.get('snapshot') or '{}')
+  except ValueError:
+    snapshot = {}
+  values = dict((field, request.form[field]) for field in fields
+    if field in request.form and request.form[field] != (snapshot.get(field) or ''))
+  genres = sorted(set(request.form.getlist('genres')))
+  # A multi-select with nothing selected isn't posted at all, so an absent
+  # genres field only means "none" when it comes from the rendered form.
+  genres_submitted = 'genres' in request.form or 'snapshot' in request.form
+  genres_changed = genres_submitted and genres != snapshot.get('genres')
+  if not values and not genres_changed:
+    return 'unchanged'
+
+  query = model.query.filter(model.id == entity_id)
+  version = request.form.get('version', type=int)
+  if version is not None:
+    query = query.filter(model.version == version)
+  values[model.version] = model.version + 1
+  if query.update(values, synchronize_session=False) == 0:
+    # Only a versioned miss needs a lookup to tell a deleted row from a
+    # newer edit; an unversioned one can only be a missing row.
+    if version is not None and db.session.query(model.id).filter(model.id == entity_id).first():
+      return 'conflict'
+    return 'missing'
+
+  if genres_changed:
+    links = link_key.table
+    db.session.execute(links.delete().where(link_key == entity_id))
+    if genres:
+      named = genres_named(genres)
+      # New Genre rows only get their ids on flush.
+      db.session.flush()
+      db.session.execute(links.insert(), [{link_key.key: entity_id, 'genre_id': genre.id}
+        for genre in named])
+  db.session.commit()
+  return 'updated'
+
+def page_validators(updated_at, show_count, last_show_id, upcoming_count, related_updated_at, last_started):
+  '''
+  (ETag, Last-Modified) of a venue or artist page. The ETag covers the
+  row, its set of shows, how many are still upcoming and the other side of
+  those shows; Last-Modified is the latest edit or show start among them.
+  '''
+  values = [updated_at, show_count or 0, last_show_id or 0, int(upcoming_count or 0),
+    related_updated_at, last_started]
+  etag = hashlib.sha1(json.dumps([value.isoformat() if isinstance(value, datetime) else value
+    for value in values]).encode()).hexdigest()
+  return etag, max(value for value in (updated_at, related_updated_at, last_started) if value is not None)
+
+def detail_validators(model, show_key, other, other_key, entity_id):
+  '''
+  page_validators() for an entity from one aggregate query, without
+  loading its shows. None if there is no entity with that id.
+  '''
+  now = datetime.now(timezone.utc)
+  row = db.session.query(model.updated_at, db.func.count(Show.id), db.func.max(Show.id),
+      db.func.sum(db.case([(Show.start_time > now, 1)], else_=0)), db.func.max(other.updated_at),
+      db.func.max(db.case([(Show.start_time <= now, Show.start_time)])))\
+    .outerjoin(Show, show_key == model.id)\
+    .outerjoin(other, other.id == other_key)\
+    .filter(model.id == entity_id)\
+    .group_by(model.id, model.updated_at)\
+    .first()
+  return page_validators(*row) if row is not None else None
+
+def split_shows(shows, show_obj):
+  '''
+  Partitions an already loaded list of shows into past and upcoming
+  results in Python, so detail pages need one round-trip for both.
+  '''
+  now = datetime.now(timezone.utc)
+  past_shows = []
+  upcoming_shows = []
+  for show in sorted(shows, key=lambda show: show.start_time):
+    if show.start_time > now:
+      upcoming_shows.append(show_obj(show))
+    else:
+      past_shows.append(show_obj(show))
+  return past_shows, upcoming_shows
+
+def venue_detail(venue_id):
+  '''
+  Loads a venue together with its shows and their artists in one joined
+  query and shapes it for the venue page. Returns None if there is no
+  venue with that id.
+  '''
+  venue = Venue.query\
+    .options(db.joinedload(Venue.shows_venue).joinedload(Show.artist),
+      db.selectinload(Venue.genres))\
+    .filter_by(id=venue_id)\
+    .first()
+  if venue is None:
+    return None
+
+  past_shows, upcoming_shows = split_shows(venue.shows_venue, lambda show: {
+    "artist_id": show.artist.id,
+    "artist_name": show.artist.name,
+    "artist_image_link": show.artist.image_link,
+    "start_time": show.start_time
+  })
+  return {
+    "id": venue.id,
+    "name": venue.name,
+    "genres": [genre.name for genre in venue.genres],
+    "address": venue.address,
+    "city": venue.city,
+    "state": venue.state,
+    "phone": venue.phone,
+    "website": venue.website,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "seeking_description": venue.seeking_description,
+    "image_link": venue.image_link,
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows),
+    "validators": page_validators(venue.updated_at, len(venue.shows_venue),
+      max((show.id for show in venue.shows_venue), default=None), len(upcoming_shows),
+      max((show.artist.updated_at for show in venue.shows_venue), default=None),
+      max((show["start_time"] for show in past_shows), default=None))
+  }
+
+def artist_detail(artist_id):
+  '''
+  Loads an artist together with its shows and their venues in one joined
+  query and shapes it for the artist page. Returns None if there is no
+  artist with that id.
+  '''
+  artist = Artist.query\
+    .options(db.joinedload(Artist.shows_artist).joinedload(Show.venue),
+      db.selectinload(Artist.genres))\
+    .filter_by(id=artist_id)\
+    .first()
+  if artist is None:
+    return None
+
+  past_shows, upcoming_shows = split_shows(artist.shows_artist, lambda show: {
+    "venue_id": show.venue.id,
+    "venue_name": show.venue.name,
+    "venue_image_link": show.venue.image_link,
+    "start_time": show.start_time
+  })
+  return {
+    "id": artist.id,
+    "name": artist.name,
+    "genres": [genre.name for genre in artist.genres],
+    "city": artist.city,
+    "state": artist.state,
+    "phone": artist.phone,
+    "website": artist.website,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking_venue,
+    "seeking_description": artist.seeking_description,
+    "image_link": artist.image_link,
+    "past_shows": past_shows,
+    "upcoming_shows": upcoming_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows),
+    "validators": page_validators(artist.updated_at, len(artist.shows_artist),
+      max((show.id for show in artist.shows_artist), default=None), len(upcoming_shows),
+      max((show.venue.updated_at for show in artist.shows_artist), default=None),
+      max((show["start_time"] for show in past_shows), default=None))
+  }
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -93,114 +665,63 @@ def index():
 
 @app.route('/venues')
 def venues():
-  areas = []
-  today = date.today().strftime("%Y-%m-%d")
-  for venue in Venue.query.distinct(Venue.city):
-    areas.append(venue.city)
-  
-  data = []
-  for area in areas:
-    venues_data = Venue.query.filter_by(city=area).all()
-
-    result = {
-        "city": area,
-        "state": venues_data[0].__dict__["state"],
-        "venues": []
-      }
-
-    for venue in venues_data:
-      upcoming_shows = Show.query.filter_by(venue_id=venue.__dict__["id"]).filter(Show.start_time > today).all()
-
-      venue_obj = {
-        "id": venue.id,
-        "name": venue.name,
-        "num_upcoming_shows": len(upcoming_shows)
-      }
-      result["venues"].append(venue_obj)
-    
-    data.append(result)
-
-  return render_template('pages/venues.html', areas=data);
+  after = request.args.get('after')
+  limit = page_size()
+  genre = request.args.get('genre')
+  if after is None and limit == app.config['PAGE_SIZE'] and not genre:
+    areas, next_cursor = cache.get_or_set('venues', lambda: venue_areas(None, limit))
+  else:
+    areas, next_cursor = venue_areas(after, limit, genre)
+  return render_template('pages/venues.html', areas=areas, next_cursor=next_cursor)
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
-  query = request.form.get('search_term', '').lower()
-  today = date.today().strftime("%Y-%m-%d")
-  response_data = Venue.query.all()
-  filtered_data = []
-
-  def split(word): 
-    return [char for char in word] 
-
-  for venue in response_data:
-    if len(query) == 1:
-      words = venue.__dict__["name"].split()
-      for word in words:
-        letters = split(word.lower())
-        for char in letters: 
-          if char == query:
-            filtered_data.append(venue)
-    elif len(query) > 1:
-      result = venue.__dict__["name"].lower().find(query)
-      if result == -1:
-        continue
-      else: filtered_data.append(venue)
-  filtered_data = set(filtered_data)
-
+  search_term = request.form.get('search_term', '')
+  data = search_by_name(Venue, search_term)
   response = {
-    "count": len(filtered_data),
-    "data": []
+    "count": len(data),
+    "data": data
   }
-
-  for result in filtered_data:
-    upcoming_shows = Show.query.filter_by(venue_id=result.__dict__["id"]).filter(Show.start_time > today).all()
-    result_obj = {
-      "id": result.__dict__["id"],
-      "name": result.__dict__["name"],
-      "num_upcoming_shows": len(upcoming_shows)
-    }
-    response["data"].append(result_obj)
-  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+def conditional_detail(key, validators, load, render):
+  '''
+  Serves a detail page with ETag/Last-Modified validators, answering 304
+  before any rendering. On a cache miss, a conditional request first runs
+  the cheap `validators` query, so an unchanged page never loads its shows.
+  '''
+  data = cache.get(key)
+  if data is None:
+    if request.if_none_match or request.if_modified_since:
+      found = validators()
+      if found is None:
+        abort(404)
+      if not modified(*found):
+        return validated(app.response_class(status=304), *found)
+    data = load()
+    if data is None:
+      abort(404)
+    cache.set(key, data)
+  if not modified(*data["validators"]):
+    return validated(app.response_class(status=304), *data["validators"])
+  return validated(make_response(render(data)), *data["validators"])
+
+def modified(etag, last_modified):
+  return is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+def validated(response, etag, last_modified):
+  response.set_etag(etag)
+  response.last_modified = last_modified
+  # Cacheable, but browsers must check back, which costs a 304 at most.
+  response.cache_control.no_cache = True
+  return response
 
 @app.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
-  today = date.today().strftime("%Y-%m-%d")
-  venue = Venue.query.filter_by(id=venue_id).all()
-  past_shows = Show.query.filter_by(venue_id=venue_id).filter(Show.start_time < today).all()
-  upcoming_shows = Show.query.filter_by(venue_id=venue_id).filter(Show.start_time > today).all()
-
-  past_shows_results = []
-  upcoming_shows_results = []
-  if len(past_shows) > 0: 
-    for show in past_shows:
-      artist = Artist.query.filter_by(id=show.__dict__["artist_id"]).all()[0]
-      show_obj = {
-        "artist_id": artist.__dict__["id"],
-        "artist_name": artist.__dict__["name"],
-        "artist_image_link": artist.__dict__["image_link"],
-        "start_time": show.__dict__["start_time"]
-      }
-      past_shows_results.append(show_obj)
-
-  if len(upcoming_shows) > 0:
-    for show in upcoming_shows:
-      artist = Artist.query.filter_by(id=show.__dict__["artist_id"]).all()[0]
-      show_obj = {
-        "artist_id": artist.__dict__["id"],
-        "artist_name": artist.__dict__["name"],
-        "artist_image_link": artist.__dict__["image_link"],
-        "start_time": show.__dict__["start_time"]
-      }
-      upcoming_shows_results.append(show_obj)
-
-  data = venue[0].__dict__
-  data["genres"] = json.loads(data["genres"])
-  data["past_shows"] = past_shows_results
-  data["upcoming_shows"] = upcoming_shows_results
-  data["past_shows_count"] = len(past_shows_results)
-  data["upcoming_shows_count"] = len(upcoming_shows_results)
-
-  return render_template('pages/show_venue.html', venue=data)
+  return conditional_detail('venue:%s' % venue_id,
+    lambda: detail_validators(Venue, Show.venue_id, Artist, Show.artist_id, venue_id),
+    lambda: venue_detail(venue_id),
+    lambda data: render_template('pages/show_venue.html', venue=data))
 
 #  Create Venue
 #  ----------------------------------------------------------------
@@ -217,7 +738,7 @@ def create_venue_submission():
   error = False
 
   try:
-    genres = json.dumps(request.form.getlist("genres"))
+    genres = genres_named(request.form.getlist("genres"))
 
     venue = Venue(name=request.form["name"],\
       genres=genres,\
@@ -228,6 +749,7 @@ def create_venue_submission():
       facebook_link=request.form["facebook_link"])
     db.session.add(venue)
     db.session.commit()
+    cache.delete('venues')
   except:
     error = True
     db.session.rollback()
@@ -245,12 +767,9 @@ def delete_venue(venue_id):
   # clicking that button delete it from the db then redirect the user to the homepage
   error = False
   try:
-    venue = Venue.query.filter_by(id=venue_id).all()
-    Venue.query.filter_by(id=venue_id).delete()
-    db.session.commit()
+    delete_venues([venue_id])
   except:
     error = True
-    db.session.rollback()
   finally:
     db.session.close()
 
@@ -261,132 +780,73 @@ def delete_venue(venue_id):
 
   return render_template('pages/home.html')
   # delete is working but redirect is not
+
+@app.route('/venues', methods=['DELETE'])
+def delete_venues_by_id():
+  # Bulk delete: {"ids": [1, 2, ...]} as JSON, or repeated ?id= arguments.
+  payload = request.get_json(silent=True) or {}
+  try:
+    venue_ids = [int(id) for id in payload.get('ids') or request.args.getlist('id')]
+  except (TypeError, ValueError):
+    abort(400)
+  if not venue_ids:
+    abort(400)
+  try:
+    deleted = delete_venues(venue_ids)
+  finally:
+    db.session.close()
+  return jsonify({"deleted": deleted})
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
 def artists():
-  artists = Artist.query.all()
-  data = []
-  for artist in artists:
-    artist_dict = {
-      "id": artist.id,
-      "name": artist.name
-    }
-    data.append(artist_dict)
-  return render_template('pages/artists.html', artists=data)
+  data, next_cursor = artist_page(request.args.get('after'), page_size(), request.args.get('genre'))
+  return render_template('pages/artists.html', artists=data, next_cursor=next_cursor)
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
-  query = request.form.get('search_term', '').lower()
-  today = date.today().strftime("%Y-%m-%d")
-  response_data = Artist.query.all()
-  filtered_data = []
-
-  def split(word): 
-    return [char for char in word]  
-
-  for artist in response_data:
-    if len(query) == 1:
-      words = artist.__dict__["name"].split()
-      for word in words:
-        letters = split(word.lower())
-        for char in letters: 
-          if char == query:
-            filtered_data.append(artist)
-    elif len(query) > 1:
-      result = artist.__dict__["name"].lower().find(query)
-      if result == -1:
-        continue
-      else: filtered_data.append(artist)
-  filtered_data = set(filtered_data)
-  
-  data = []
-
-  for artist in filtered_data:
-    upcoming_shows = Show.query.filter_by(artist_id=artist.__dict__["id"]).filter(Show.start_time > today).all()
-    artist = {
-      "id": artist.__dict__["id"],
-      "name": artist.__dict__["name"],
-      "num_upcoming_shows": len(upcoming_shows)
-    }
-    data.append(artist)
-  
-  response={
-    "count": len(filtered_data),
+  search_term = request.form.get('search_term', '')
+  data = search_by_name(Artist, search_term)
+  response = {
+    "count": len(data),
     "data": data
   }
-  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+  return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 @app.route('/artists/<int:artist_id>')
 def show_artist(artist_id):
-  today = date.today().strftime("%Y-%m-%d")
-  artist = Artist.query.filter_by(id=artist_id).all()
-  past_shows = Show.query.filter_by(artist_id=artist_id).filter(Show.start_time < today).all()
-  upcoming_shows = Show.query.filter_by(artist_id=artist_id).filter(Show.start_time > today).all()
-
-  past_shows_results = []
-  upcoming_shows_results = []
-
-  if len(past_shows) > 0: 
-    for show in past_shows:
-      venue = Venue.query.filter_by(id=show.__dict__["venue_id"]).all()[0]
-      show_obj = {
-        "venue_id": venue.__dict__["id"],
-        "venue_name": venue.__dict__["name"],
-        "venue_image_link": venue.__dict__["image_link"],
-        "start_time": show.__dict__["start_time"]
-      }
-      past_shows_results.append(show_obj)
-
-  if len(upcoming_shows) > 0:
-    for show in upcoming_shows:
-      venue = Venue.query.filter_by(id=show.__dict__["venue_id"]).all()[0]
-      show_obj = {
-        "venue_id": venue.__dict__["id"],
-        "venue_name": venue.__dict__["name"],
-        "venue_image_link": venue.__dict__["image_link"],
-        "start_time": show.__dict__["start_time"]
-      }
-      upcoming_shows_results.append(show_obj)
-
-  data = artist[0].__dict__
-  data["genres"] = json.loads(data["genres"])
-  data["past_shows"] = past_shows_results
-  data["upcoming_shows"] = upcoming_shows_results
-  data["past_shows_count"] = len(past_shows_results)
-  data["upcoming_shows_count"] = len(upcoming_shows_results)
-
-  return render_template('pages/show_artist.html', artist=data)
+  return conditional_detail('artist:%s' % artist_id,
+    lambda: detail_validators(Artist, Show.artist_id, Venue, Show.venue_id, artist_id),
+    lambda: artist_detail(artist_id),
+    lambda data: render_template('pages/show_artist.html', artist=data))
 
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
-  form = ArtistForm()
-  artist= Artist.query.filter_by(id=artist_id)[0]
+  artist = Artist.query.get_or_404(artist_id)
+  form = ArtistForm(data=edit_form_data(artist, ARTIST_EDIT_FIELDS))
 
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
   error = False
+  outcome = None
   try:
-    form_data = request.form
-    genres = json.dumps(form_data.getlist("genres"))
-
-    artist = Artist.query.filter_by(id=artist_id).all()[0]
-    setattr(artist, "name", request.form["name"])
-    setattr(artist, "genres", genres)
-    setattr(artist, "city", request.form["city"])
-    setattr(artist, "state", request.form["state"])
-    setattr(artist, "phone", request.form["phone"])
-    setattr(artist, "facebook_link", request.form["facebook_link"])
-    db.session.commit()
+    outcome = save_edit(Artist, artist_genre.c.artist_id, artist_id, ARTIST_EDIT_FIELDS)
+    if outcome == 'updated':
+      cache.delete(*artist_cache_keys(artist_id))
   except:
     error = True
     db.session.rollback()
   finally:
     db.session.close()
+  if outcome == 'missing':
+    abort(404)
+  if outcome == 'conflict':
+    flash('Artist ' + request.form["name"] + ' was changed by someone else, please review it and try again.')
+    return redirect(url_for('edit_artist', artist_id=artist_id))
   if error:
     flash('An error occurred. Artist ' + request.form["name"] + ' could not be updated.')
   else:
@@ -396,30 +856,28 @@ def edit_artist_submission(artist_id):
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
-  form = VenueForm()
-  venue = Venue.query.filter_by(id=venue_id).all()[0]
+  venue = Venue.query.get_or_404(venue_id)
+  form = VenueForm(data=edit_form_data(venue, VENUE_EDIT_FIELDS))
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
   error = False
+  outcome = None
   try:
-    genres = json.dumps(request.form.getlist("genres"))
-
-    venue = Venue.query.filter_by(id=venue_id).all()[0]
-    setattr(venue, "name", request.form["name"])
-    setattr(venue, "genres", genres)
-    setattr(venue, "address", request.form["address"])
-    setattr(venue, "city", request.form["city"])
-    setattr(venue, "state", request.form["state"])
-    setattr(venue, "phone", request.form["phone"])
-    setattr(venue, "facebook_link", request.form["facebook_link"])
-    db.session.commit()
+    outcome = save_edit(Venue, venue_genre.c.venue_id, venue_id, VENUE_EDIT_FIELDS)
+    if outcome == 'updated':
+      cache.delete(*venue_cache_keys(venue_id))
   except:
     error = True
     db.session.rollback()
   finally:
     db.session.close()
+  if outcome == 'missing':
+    abort(404)
+  if outcome == 'conflict':
+    flash('Venue ' + request.form["name"] + ' was changed by someone else, please review it and try again.')
+    return redirect(url_for('edit_venue', venue_id=venue_id))
   if error:
     flash('An error occurred. Venue ' + request.form["name"] + ' could not be updated.')
   else:
@@ -439,9 +897,10 @@ def create_artist_form():
 def create_artist_submission():
   # TODO: modify data to be the data object returned from db insertion
   error = False
-  genres = json.dumps(request.form.getlist("genres"))
 
   try:
+    genres = genres_named(request.form.getlist("genres"))
+
     artist = Artist(name=request.form["name"],\
       genres=genres,\
       city=request.form["city"],\
@@ -468,23 +927,8 @@ def create_artist_submission():
 
 @app.route('/shows')
 def shows():
-  shows = Show.query.all()
-  data = []
-  for show in shows:
-    venue = Venue.query.filter_by(id=show.__dict__["venue_id"]).all()[0]
-    artist = Artist.query.filter_by(id=show.__dict__["artist_id"]).all()[0]
-
-    show_dict = {
-      "venue_id": show.__dict__["venue_id"],
-      "venue_name": venue.__dict__["name"],
-      "artist_id": show.__dict__["artist_id"],
-      "artist_name": artist.__dict__["name"],
-      "artist_image_link": artist.__dict__["image_link"],
-      "start_time": show.__dict__["start_time"]
-    }
-    data.append(show_dict)
-
-  return render_template('pages/shows.html', shows=data)
+  data, next_cursor = show_page(request.args.get('after'), page_size())
+  return render_template('pages/shows.html', shows=data, next_cursor=next_cursor)
 
 @app.route('/shows/create')
 def create_shows():
@@ -499,9 +943,11 @@ def create_show_submission():
   try:
     show = Show(venue_id=request.form["venue_id"],\
       artist_id=request.form["artist_id"],\
-      start_time=request.form["start_time"])
+      start_time=dateutil.parser.parse(request.form["start_time"]))
     db.session.add(show)
     db.session.commit()
+    cache.delete('venue:%s' % request.form["venue_id"],
+      'artist:%s' % request.form["artist_id"], 'venues', 'shows')
   except:
     error = True
     db.session.rollback()
@@ -514,6 +960,10 @@ def create_show_submission():
 
   return render_template('pages/home.html')
 
+@app.route('/metrics')
+def metrics():
+  return jsonify({"pool": pool_status(db.engine)})
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -533,6 +983,218 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+data_cli = AppGroup('data', help='Bulk import and export of venues, artists and shows.')
+
+# entity -> (model, link table column for its genres)
+BULK_ENTITIES = {
+  'venues': (Venue, venue_genre.c.venue_id),
+  'artists': (Artist, artist_genre.c.artist_id),
+  'shows': (Show, None)
+}
+
+def prepare_record(table, link_key, record):
+  row = bulk.coerce(table, record)
+  if link_key is not None:
+    if row.get('id') is None:
+      raise click.ClickException('%s rows need an id column to link their genres' % table.name)
+    genres = row.get('genres') or []
+    row['genres'] = json.loads(genres) if isinstance(genres, str) else genres
+  return row
+
+def link_genres(link_key):
+  '''
+  after_batch hook writing the genre links of a batch of imported rows,
+  creating missing genres with one INSERT per batch.
+  '''
+  genre = Genre.__table__
+
+  def after_batch(connection, rows):
+    names = set(name for row in rows for name in row['genres'])
+    if not names:
+      return
+    query = db.select([genre.c.name, genre.c.id]).where(genre.c.name.in_(names))
+    known = dict(connection.execute(query).fetchall())
+    if names - set(known):
+      connection.execute(genre.insert(), [{'name': name} for name in sorted(names - set(known))])
+      known = dict(connection.execute(query).fetchall())
+    connection.execute(link_key.table.insert(), [{link_key.key: row['id'], 'genre_id': known[name]}
+      for row in rows for name in set(row['genres'])])
+  return after_batch
+
+def attach_genres(link_key):
+  '''
+  extend hook adding a `genres` list to a batch of exported rows with one
+  query per batch.
+  '''
+  def extend(connection, rows):
+    names = {}
+    query = db.select([link_key, Genre.name])\
+      .select_from(link_key.table.join(Genre, link_key.table.c.genre_id == Genre.id))\
+      .where(link_key.in_([row['id'] for row in rows]))
+    for id, name in connection.execute(query):
+      names.setdefault(id, []).append(name)
+    for row in rows:
+      row['genres'] = sorted(names.get(row['id'], []))
+  return extend
+
+def report_progress(entity):
+  return bulk.Progress(lambda rows, rate:
+    click.echo('\r%s: %d rows (%d rows/s)' % (entity, rows, rate), nl=False, err=True))
+
+@data_cli.command('import')
+@click.argument('entity', type=click.Choice(sorted(BULK_ENTITIES)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(bulk.FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT/COPY and commit.')
+def import_data(entity, path, format, batch_size):
+  '''
+  Streams a CSV or NDJSON file into ENTITY. Venue and artist rows need an
+  id column; genres are given as a JSON list. Running web workers list
+  the imported rows once their cached pages expire (CACHE_TTL).
+  '''
+  model, link_key = BULK_ENTITIES[entity]
+  table = model.__table__
+  with open(path, newline='') as file:
+    progress = bulk.load(db.engine, table, bulk.read_records(file, bulk.file_format(path, format)),
+      batch_size=batch_size,
+      prepare=lambda record: prepare_record(table, link_key, record),
+      after_batch=link_genres(link_key) if link_key is not None else None,
+      progress=report_progress(entity))
+  click.echo('', err=True)
+  rebuild_upcoming_counts()
+  click.echo('Imported %d %s (%d rows/s)' % (progress.rows, entity, progress.rate), err=True)
+
+@data_cli.command('export')
+@click.argument('entity', type=click.Choice(sorted(BULK_ENTITIES)))
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', type=click.Choice(bulk.FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows fetched per round-trip.')
+def export_data(entity, path, format, batch_size):
+  '''
+  Streams every ENTITY row to a CSV or NDJSON file in id order.
+  '''
+  model, link_key = BULK_ENTITIES[entity]
+  table = model.__table__
+  with open(path, 'w', newline='') as file:
+    progress = bulk.dump(db.engine, table.select().order_by(table.c.id), file,
+      bulk.file_format(path, format),
+      batch_size=batch_size,
+      extend=attach_genres(link_key) if link_key is not None else None,
+      progress=report_progress(entity))
+  click.echo('', err=True)
+  click.echo('Exported %d %s (%d rows/s)' % (progress.rows, entity, progress.rate), err=True)
+
+app.cli.add_command(data_cli)
+
+counters_cli = AppGroup('counters', help='Maintenance of the precomputed upcoming show counters.')
+
+@counters_cli.command('rollover')
+def rollover_counters():
+  '''
+  Stops counting shows that have started as upcoming. Meant to run
+  periodically, e.g. every few minutes from cron. The page cache lives in
+  each web worker, out of reach of this process, so cached pages show the
+  new counts once their CACHE_TTL runs out.
+  '''
+  venue_ids, artist_ids = roll_over_upcoming_counts()
+  click.echo('Rolled over shows at %d venues and %d artists' % (len(venue_ids), len(artist_ids)), err=True)
+
+@counters_cli.command('rebuild')
+def rebuild_counters():
+  '''
+  Recomputes every upcoming show counter from the show table. Like
+  rollover, it leaves the web workers' page caches to expire by CACHE_TTL.
+  '''
+  rebuild_upcoming_counts()
+  click.echo('Rebuilt upcoming show counters', err=True)
+
+app.cli.add_command(counters_cli)
+
+assets_cli = AppGroup('assets', help='Static asset build.')
+
+@assets_cli.command('build')
+def build_assets():
+  '''
+  Writes content-hashed, gzip/brotli-compressed copies of static/ to
+  static/<ASSETS_FOLDER> with a manifest that asset_url() reads. Restart
+  the app (or its workers) afterwards to pick up the new manifest.
+  '''
+  manifest = static_assets.build()
+  click.echo('Built %d assets into %s' % (len(manifest),
+    os.path.join(app.static_folder, app.config['ASSETS_FOLDER'])), err=True)
+
+app.cli.add_command(assets_cli)
+
+def warm_templates():
+  # Compiles every template into the environment's cache, and into the
+  # bytecode cache when TEMPLATE_BYTECODE_CACHE_DIR is set.
+  names = app.jinja_env.list_templates(extensions=['html'])
+  for name in names:
+    app.jinja_env.get_template(name)
+  return '%d templates' % len(names)
+
+def warm_babel():
+  # Loads the locale data and parses the patterns the datetime filter uses.
+  now = utcnow()
+  for format in DATETIME_FORMATS:
+    format_datetime(now, format)
+  dateutil.parser.parse(now.isoformat())
+  return app.config['DATETIME_LOCALE']
+
+def warm_mappers():
+  db.configure_mappers()
+  return '%d models' % len(db.Model.registry.mappers)
+
+def warm_database():
+  # The first connection also runs the dialect's server version checks.
+  with db.engine.connect() as connection:
+    connection.execute(db.select([1]))
+  # Don't keep the connection pooled: a preforking server (gunicorn --preload)
+  # would hand the same socket to every worker it forks.
+  db.engine.dispose()
+  return db.engine.url.get_backend_name()
+
+WARMUP_STEPS = (
+  ('templates', warm_templates),
+  ('babel', warm_babel),
+  ('mappers', warm_mappers),
+  ('database', warm_database),
+)
+
+def warmup():
+  '''
+  Does the work the first requests of a fresh process would otherwise pay
+  for. Returns (step, seconds, detail) for each step; a failing step is
+  logged and skipped so an unreachable database doesn't block startup.
+  '''
+  timings = []
+  for name, step in WARMUP_STEPS:
+    started = time.perf_counter()
+    try:
+      detail = step()
+    except Exception as error:
+      app.logger.warning('warmup step %s failed: %s', name, error)
+      detail = 'failed: %s' % error
+    timings.append((name, time.perf_counter() - started, detail))
+  return timings
+
+@app.cli.command('warmup')
+def warmup_command():
+  '''
+  Runs the warmup steps and reports how long each took. With
+  TEMPLATE_BYTECODE_CACHE_DIR set, this also fills the bytecode cache
+  that later processes load their templates from.
+  '''
+  for name, seconds, detail in warmup():
+    click.echo('%-10s %8.1f ms  %s' % (name, seconds * 1000, detail), err=True)
+
+if app.config['WARMUP_ON_STARTUP']:
+  warmup()
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
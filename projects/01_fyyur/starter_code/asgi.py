@@ -0,0 +1,164 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point.
+#
+#   $ uvicorn asgi:application --workers 4
+#----------------------------------------------------------------------------#
+
+import io
+import sys
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from app import app, db
+from pooling import POOL_SETTINGS
+
+# Read-heavy endpoints served on the event loop with the async driver.
+ASYNC_ENDPOINTS = ('venues', 'show_venue', 'show_artist', 'shows')
+
+# sync URL scheme -> async driver
+ASYNC_DRIVERS = {
+  'postgresql': 'postgresql+asyncpg',
+  'postgresql+psycopg2': 'postgresql+asyncpg',
+  'sqlite': 'sqlite+aiosqlite'
+}
+
+
+def async_database_uri(config):
+  '''
+  ASYNC_DATABASE_URI if set, else SQLALCHEMY_DATABASE_URI with its driver
+  swapped for the asyncio one (asyncpg or aiosqlite).
+  '''
+  if config.get('ASYNC_DATABASE_URI'):
+    return config['ASYNC_DATABASE_URI']
+  scheme, rest = config['SQLALCHEMY_DATABASE_URI'].split(':', 1)
+  if scheme not in ASYNC_DRIVERS:
+    raise ValueError('No async driver known for %s, set ASYNC_DATABASE_URI' % scheme)
+  return ASYNC_DRIVERS[scheme] + ':' + rest
+
+
+def async_engine_options(config, uri):
+  '''
+  The DB_* pool settings for the async engine. asyncpg takes the statement
+  timeout as a server setting rather than libpq options.
+  '''
+  if uri.startswith('sqlite'):
+    return {}
+  options = {}
+  for setting, argument in POOL_SETTINGS:
+    if config.get(setting) is not None:
+      options[argument] = config[setting]
+  if config.get('DB_STATEMENT_TIMEOUT_MS'):
+    options['connect_args'] = {'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])}}
+  return options
+
+
+def build_environ(scope):
+  '''
+  WSGI environ for a body-less ASGI HTTP request.
+  '''
+  server_name, server_port = scope.get('server') or ('localhost', 80)
+  environ = {
+    'REQUEST_METHOD': scope['method'],
+    'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+    'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+    'QUERY_STRING': scope['query_string'].decode('ascii'),
+    'SERVER_PROTOCOL': 'HTTP/%s' % scope['http_version'],
+    'SERVER_NAME': server_name,
+    'SERVER_PORT': str(server_port),
+    'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+    'wsgi.version': (1, 0),
+    'wsgi.url_scheme': scope.get('scheme', 'http'),
+    'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr,
+    'wsgi.multithread': False,
+    'wsgi.multiprocess': True,
+    'wsgi.run_once': False,
+  }
+  for name, value in scope['headers']:
+    name = name.decode('latin1').upper().replace('-', '_')
+    if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+      name = 'HTTP_' + name
+    value = value.decode('latin1')
+    environ[name] = environ[name] + ',' + value if name in environ else value
+  return environ
+
+
+class AsyncApp(object):
+  '''
+  ASGI application wrapping the Flask app. GET/HEAD requests for
+  ASYNC_ENDPOINTS run the unchanged Flask views with db.session bound to
+  an AsyncSession: SQLAlchemy runs the view in a greenlet and suspends it
+  on every database round-trip, so one worker overlaps the queries of
+  many requests. Everything else goes through asgiref's WSGI adapter,
+  which runs the view in a thread with the regular engine.
+  '''
+
+  def __init__(self, app, endpoints=ASYNC_ENDPOINTS):
+    self.app = app
+    self.endpoints = set(endpoints)
+    self.wsgi = WsgiToAsgi(app)
+    self.urls = app.url_map.bind('localhost')
+    self.engine = None
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] == 'lifespan':
+      return await self.lifespan(receive, send)
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') and self.is_async(scope):
+      return await self.handle(scope, send)
+    return await self.wsgi(scope, receive, send)
+
+  def is_async(self, scope):
+    try:
+      endpoint, _ = self.urls.match(scope['path'], scope['method'])
+    except HTTPException:
+      return False
+    return endpoint in self.endpoints
+
+  def get_engine(self):
+    if self.engine is None:
+      uri = async_database_uri(self.app.config)
+      self.engine = create_async_engine(uri, **async_engine_options(self.app.config, uri))
+    return self.engine
+
+  async def lifespan(self, receive, send):
+    while True:
+      message = await receive()
+      if message['type'] == 'lifespan.startup':
+        self.get_engine()
+        await send({'type': 'lifespan.startup.complete'})
+      elif message['type'] == 'lifespan.shutdown':
+        if self.engine is not None:
+          await self.engine.dispose()
+        await send({'type': 'lifespan.shutdown.complete'})
+        return
+
+  async def handle(self, scope, send):
+    environ = build_environ(scope)
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+      started['status'] = int(status.split(' ', 1)[0])
+      started['headers'] = [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+
+    def run(session):
+      # Flask-SQLAlchemy scopes db.session by greenlet, so this binds it
+      # for this request only; the app context teardown removes it again.
+      db.session.registry.set(session)
+      try:
+        response = self.app(environ, start_response)
+        try:
+          return b''.join(response)
+        finally:
+          if hasattr(response, 'close'):
+            response.close()
+      finally:
+        db.session.registry.clear()
+
+    async with AsyncSession(self.get_engine()) as session:
+      body = await session.run_sync(run)
+    await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+application = AsyncApp(app)
@@ -0,0 +1,170 @@
+#----------------------------------------------------------------------------#
+# Fingerprinted, precompressed static assets.
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+# Types worth compressing; images and woff fonts already are.
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.ttf', '.otf', '.eot', '.ico')
+# encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+FAR_FUTURE = 365 * 24 * 60 * 60
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def fingerprint(path, content):
+  base, extension = posixpath.splitext(path)
+  return '%s.%s%s' % (base, hashlib.sha256(content).hexdigest()[:12], extension)
+
+
+def rewrite_css_urls(path, content, manifest):
+  '''
+  Points the relative url()s of a stylesheet at the fingerprinted copies
+  of the files they reference, keeping any query string or fragment.
+  '''
+  directory = posixpath.dirname(path)
+
+  def replace(match):
+    quote, url = match.groups()
+    if re.match(r'^([a-z]+:|/|#)', url):
+      return match.group(0)
+    target, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+    hashed = manifest.get(posixpath.normpath(posixpath.join(directory, target)))
+    if hashed is None:
+      return match.group(0)
+    return 'url(%s%s%s%s)' % (quote, posixpath.relpath(hashed, directory or '.'), suffix, quote)
+
+  return CSS_URL.sub(replace, content.decode('utf8')).encode('utf8')
+
+
+def write_variants(path, content):
+  '''
+  Writes .gz (and .br, when the brotli package is installed) next to a
+  compressible file, keeping only the variants that come out smaller.
+  '''
+  if not path.endswith(COMPRESSIBLE):
+    return
+  variants = [('.gz', gzip.compress(content, 9, mtime=0))]
+  if brotli is not None:
+    variants.append(('.br', brotli.compress(content, quality=11)))
+  for suffix, compressed in variants:
+    if len(compressed) < len(content):
+      with open(path + suffix, 'wb') as file:
+        file.write(compressed)
+
+
+def build(static_folder, output='dist'):
+  '''
+  Copies every file of `static_folder` into `static_folder/output` under a
+  content-hashed name, with compressed variants, and writes manifest.json
+  mapping each original name to its hashed one. Stylesheets go last so
+  their url()s can be rewritten to the hashed fonts and images first.
+  Returns the manifest.
+  '''
+  target = os.path.join(static_folder, output)
+  if os.path.isdir(target):
+    shutil.rmtree(target)
+
+  sources = []
+  for directory, directories, files in os.walk(static_folder):
+    directories[:] = sorted(name for name in directories if os.path.join(directory, name) != target)
+    for name in sorted(files):
+      sources.append(os.path.relpath(os.path.join(directory, name), static_folder).replace(os.sep, '/'))
+  sources.sort(key=lambda path: path.endswith('.css'))
+
+  manifest = {}
+  for path in sources:
+    with open(os.path.join(static_folder, path), 'rb') as file:
+      content = file.read()
+    if path.endswith('.css'):
+      content = rewrite_css_urls(path, content, manifest)
+    hashed = fingerprint(path, content)
+    destination = os.path.join(target, hashed)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    with open(destination, 'wb') as file:
+      file.write(content)
+    write_variants(destination, content)
+    manifest[path] = hashed
+
+  with open(os.path.join(target, 'manifest.json'), 'w') as file:
+    json.dump(manifest, file, indent=2, sort_keys=True)
+  return manifest
+
+
+class Assets(object):
+  '''
+  Flask extension serving the output of build(). Templates call
+  asset_url(filename), which takes the same filename as
+  url_for('static', filename=...) and returns the fingerprinted URL when
+  the file has been built (the plain one otherwise). Fingerprinted files
+  are served with a one-year immutable Cache-Control and, when the client
+  accepts it, straight from their .br or .gz variant. ASSETS_FOLDER is the
+  build folder inside the static folder.
+  '''
+
+  def __init__(self, app=None):
+    self.manifest = {}
+    self.hashed = set()
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('ASSETS_FOLDER', 'dist')
+    self.app = app
+    self.folder = app.config['ASSETS_FOLDER']
+    self.load()
+    app.jinja_env.globals['asset_url'] = self.asset_url
+    app.view_functions['static'] = self.send_static_file
+    app.extensions['assets'] = self
+
+  def load(self):
+    path = os.path.join(self.app.static_folder, self.folder, 'manifest.json')
+    if os.path.exists(path):
+      with open(path) as file:
+        self.manifest = json.load(file)
+    else:
+      self.manifest = {}
+    self.hashed = set(self.manifest.values())
+
+  def build(self):
+    manifest = build(self.app.static_folder, self.folder)
+    self.load()
+    return manifest
+
+  def asset_url(self, filename, **values):
+    if filename in self.manifest:
+      filename = posixpath.join(self.folder, self.manifest[filename])
+    return url_for('static', filename=filename, **values)
+
+  def send_static_file(self, filename):
+    prefix = self.folder + '/'
+    if not filename.startswith(prefix) or filename[len(prefix):] not in self.hashed:
+      return self.app.send_static_file(filename)
+
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+      if accepted[encoding] and os.path.exists(os.path.join(self.app.static_folder, filename + suffix)):
+        response = send_from_directory(self.app.static_folder, filename + suffix,
+          mimetype=mimetypes.guess_type(filename)[0], max_age=FAR_FUTURE)
+        response.headers['Content-Encoding'] = encoding
+        break
+    else:
+      response = send_from_directory(self.app.static_folder, filename, max_age=FAR_FUTURE)
+    response.headers['Cache-Control'] = 'public, max-age=%d, immutable' % FAR_FUTURE
+    response.vary.add('Accept-Encoding')
+    return response
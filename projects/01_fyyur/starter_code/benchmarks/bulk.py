@@ -0,0 +1,82 @@
+'''
+Benchmark of `flask data import` / `flask data export` on a synthetic set
+of shows (1M by default).
+
+Runs against a throwaway SQLite file unless --database-url points at a
+Postgres database, where the import goes through COPY.
+
+    $ python -m benchmarks.bulk --shows 1000000 --batch-size 10000
+'''
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from app import app, db
+
+
+def write_fixtures(directory, venues, artists, shows):
+  paths = {}
+  for entity, count in (('venues', venues), ('artists', artists)):
+    paths[entity] = os.path.join(directory, entity + '.ndjson')
+    with open(paths[entity], 'w') as file:
+      for id in range(1, count + 1):
+        record = {'id': id, 'name': '%s %d' % (entity[:-1].title(), id), 'genres': ['Jazz'],
+          'city': 'City %d' % (id % 50), 'state': 'CA', 'phone': '123-123-1234'}
+        if entity == 'venues':
+          record['address'] = '%d Main St' % id
+        file.write(json.dumps(record) + '\n')
+
+  start = datetime(2020, 1, 1, 20, tzinfo=timezone.utc)
+  paths['shows'] = os.path.join(directory, 'shows.ndjson')
+  with open(paths['shows'], 'w') as file:
+    for id in range(shows):
+      file.write(json.dumps({'venue_id': id % venues + 1, 'artist_id': id % artists + 1,
+        'start_time': (start + timedelta(hours=id)).isoformat()}) + '\n')
+  return paths
+
+
+def invoke(runner, args):
+  started = time.monotonic()
+  result = runner.invoke(args=args)
+  if result.exit_code != 0:
+    raise SystemExit(result.output)
+  return time.monotonic() - started
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--shows', type=int, default=1000000)
+  parser.add_argument('--venues', type=int, default=1000)
+  parser.add_argument('--artists', type=int, default=1000)
+  parser.add_argument('--batch-size', type=int, default=10000)
+  parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+  args = parser.parse_args()
+
+  directory = tempfile.mkdtemp(prefix='fyyur-bulk-')
+  try:
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_url or \
+      'sqlite:///' + os.path.join(directory, 'fyyur.db')
+    with app.app_context():
+      db.drop_all()
+      db.create_all()
+
+    paths = write_fixtures(directory, args.venues, args.artists, args.shows)
+    runner = app.test_cli_runner()
+    batch = ['--batch-size', str(args.batch_size)]
+    invoke(runner, ['data', 'import', 'venues', paths['venues']] + batch)
+    invoke(runner, ['data', 'import', 'artists', paths['artists']] + batch)
+
+    elapsed = invoke(runner, ['data', 'import', 'shows', paths['shows']] + batch)
+    print('import %d shows: %6.2f s  %9d rows/s' % (args.shows, elapsed, args.shows / elapsed))
+    elapsed = invoke(runner, ['data', 'export', 'shows', os.path.join(directory, 'export.ndjson')] + batch)
+    print('export %d shows: %6.2f s  %9d rows/s' % (args.shows, elapsed, args.shows / elapsed))
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  main()
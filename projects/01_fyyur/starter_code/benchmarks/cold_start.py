@@ -0,0 +1,97 @@
+'''
+Cold start of a fresh app process, with and without warmup.
+
+Each run starts a new interpreter that imports app.py and then requests
+/venues, /venues/1, /artists/1 and /shows once, timing the import (which
+includes WARMUP_ON_STARTUP) and each first response. Three setups are
+compared: no warmup, warmup on startup, and warmup on startup with a
+template bytecode cache filled beforehand by `flask warmup`:
+
+    $ python -m benchmarks.cold_start --runs 5
+'''
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from app import app
+from benchmarks import dataset
+
+PATHS = ('/venues', '/venues/1', '/artists/1', '/shows')
+
+# Runs in the child process; prints one JSON line of timings in ms.
+PROBE = '''
+import json, sys, time, warnings
+warnings.simplefilter('ignore', DeprecationWarning)
+started = time.perf_counter()
+from app import app
+timings = {'import': (time.perf_counter() - started) * 1000}
+client = app.test_client()
+for path in %r:
+  started = time.perf_counter()
+  client.get(path).close()
+  timings[path] = (time.perf_counter() - started) * 1000
+print(json.dumps(timings))
+''' % (PATHS,)
+
+
+def probe(env):
+  output = subprocess.run([sys.executable, '-c', PROBE], env=env, check=True,
+    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+  return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def median(values):
+  values = sorted(values)
+  return values[len(values) // 2]
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--runs', type=int, default=5, help='fresh processes per setup')
+  parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+  parser.add_argument('--output', help='write the results as JSON to this file')
+  args = parser.parse_args()
+
+  directory = tempfile.mkdtemp(prefix='fyyur-bench-')
+  try:
+    database_url = args.database_url or 'sqlite:///' + os.path.join(directory, 'fyyur.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    with app.app_context():
+      dataset.seed(100, 100, 1000)
+
+    bytecode = os.path.join(directory, 'bytecode')
+    os.makedirs(bytecode)
+    env = dict(os.environ, DATABASE_URL=database_url, WARMUP_ON_STARTUP='0', FLASK_APP='app.py')
+    env.pop('TEMPLATE_BYTECODE_CACHE_DIR', None)
+    subprocess.run([sys.executable, '-m', 'flask', 'warmup'], check=True,
+      env=dict(env, TEMPLATE_BYTECODE_CACHE_DIR=bytecode), stderr=subprocess.DEVNULL)
+
+    setups = (
+      ('cold', env),
+      ('warmup', dict(env, WARMUP_ON_STARTUP='1')),
+      ('warmup+bytecode', dict(env, WARMUP_ON_STARTUP='1', TEMPLATE_BYTECODE_CACHE_DIR=bytecode)),
+    )
+    results = {}
+    print('%-16s %10s %s %14s' % ('setup', 'import ms', ' '.join('%12s' % path for path in PATHS),
+      'first pages'))
+    for name, setup_env in setups:
+      runs = [probe(setup_env) for _ in range(args.runs)]
+      result = dict((key, round(median([run[key] for run in runs]), 2)) for key in runs[0])
+      result['first_pages'] = round(sum(result[path] for path in PATHS), 2)
+      results[name] = result
+      print('%-16s %10.1f %s %14.1f' % (name, result['import'],
+        ' '.join('%12.1f' % result[path] for path in PATHS), result['first_pages']))
+
+    if args.output:
+      with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,52 @@
+'''
+Synthetic Fyyur dataset for the benchmarks.
+'''
+from datetime import datetime, timedelta, timezone
+
+import bulk
+from app import db, Venue, Artist, Show, venue_genre, artist_genre, prepare_record, link_genres,\
+  rebuild_upcoming_counts
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+  'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk',
+  'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other']
+
+
+def venue_records(count):
+  for id in range(1, count + 1):
+    yield {'id': id, 'name': 'Venue %d' % id, 'genres': [GENRES[id % len(GENRES)], 'Jazz'],
+      'address': '%d Folsom Street' % id, 'city': 'City %d' % (id % 100), 'state': 'CA',
+      'phone': '123-123-1234', 'seeking_talent': id % 2 == 0, 'image_link': 'https://example.com/venue.png'}
+
+
+def artist_records(count):
+  for id in range(1, count + 1):
+    yield {'id': id, 'name': 'Artist %d' % id, 'genres': [GENRES[id % len(GENRES)]],
+      'city': 'City %d' % (id % 100), 'state': 'CA', 'phone': '326-123-5000',
+      'seeking_venue': id % 3 == 0, 'image_link': 'https://example.com/artist.png'}
+
+
+def show_records(count, venues, artists):
+  # Half of the shows are in the past and half upcoming, relative to now.
+  start = datetime.now(timezone.utc) - timedelta(hours=count // 2)
+  for id in range(count):
+    yield {'venue_id': id % venues + 1, 'artist_id': (id * 7) % artists + 1,
+      'start_time': start + timedelta(hours=id)}
+
+
+def seed(venues, artists, shows, batch_size=10000):
+  '''
+  Recreates the schema and loads `venues` venues, `artists` artists and
+  `shows` shows through the bulk loader. Must run in an app context.
+  '''
+  db.drop_all()
+  db.create_all()
+  for model, link_key, records in (
+      (Venue, venue_genre.c.venue_id, venue_records(venues)),
+      (Artist, artist_genre.c.artist_id, artist_records(artists)),
+      (Show, None, show_records(shows, venues, artists))):
+    table = model.__table__
+    bulk.load(db.engine, table, records, batch_size=batch_size,
+      prepare=lambda record, table=table, link_key=link_key: prepare_record(table, link_key, record),
+      after_batch=link_genres(link_key) if link_key is not None else None)
+  rebuild_upcoming_counts()
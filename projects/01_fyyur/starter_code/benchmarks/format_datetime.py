@@ -0,0 +1,65 @@
+'''
+Micro-benchmark of the `datetime` template filter.
+
+Compares the memoized filter in app.py with the previous implementation,
+which re-parsed the value and rebuilt the Babel formatter on every call.
+
+    $ python -m benchmarks.format_datetime --rows 10000 --distinct 500
+'''
+import argparse
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import babel.dates
+import dateutil.parser
+
+from app import app, format_datetime, cached_format_datetime
+
+
+def uncached_format_datetime(value, format='medium'):
+  date = dateutil.parser.parse(value)
+  if format == 'full':
+      format="EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+      format="EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format, locale=app.config['DATETIME_LOCALE'])
+
+
+def rows(count, distinct):
+  start = datetime(2035, 1, 1, 20, tzinfo=timezone.utc)
+  return [start + timedelta(hours=i % distinct) for i in range(count)]
+
+
+def run(label, render, values, repeat):
+  best = min(timeit.repeat(lambda: [render(value) for value in values], number=1, repeat=repeat))
+  print('%-28s %8.2f ms  %6.2f us/row' % (label, best * 1000, best * 1e6 / len(values)))
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--rows', type=int, default=10000)
+  parser.add_argument('--distinct', type=int, default=500,
+    help='number of distinct start times among the rows')
+  parser.add_argument('--repeat', type=int, default=5)
+  args = parser.parse_args()
+
+  values = rows(args.rows, args.distinct)
+  strings = [value.isoformat() for value in values]
+  print('%d rows, %d distinct start times, best of %d' % (args.rows, args.distinct, args.repeat))
+
+  with app.app_context():
+    before = run('uncached (string input)', lambda value: uncached_format_datetime(value, 'full'), strings, args.repeat)
+
+    def cold(value):
+      cached_format_datetime.cache_clear()
+      return format_datetime(value, 'full')
+    run('memoized, cold cache', cold, values, args.repeat)
+
+    cached_format_datetime.cache_clear()
+    after = run('memoized, warm cache', lambda value: format_datetime(value, 'full'), values, args.repeat)
+  print('speedup (warm): %.1fx' % (before / after))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,242 @@
+'''
+Load test of every route in app.py.
+
+Seeds a synthetic dataset, drives each route through the Flask test
+client and reports p50/p95 latency, queries per request and rows fetched
+per request. Results can be written as JSON and compared with a previous
+run:
+
+    $ python -m benchmarks.routes --venues 1000 --shows 20000 --output before.json
+    $ python -m benchmarks.routes --venues 1000 --shows 20000 --compare before.json
+'''
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+from itertools import count
+
+import sqlalchemy
+from sqlalchemy import event
+
+from app import app, db, cache
+from cache import NullCache
+from benchmarks import dataset
+
+
+class Counters(object):
+  queries = 0
+  rows = 0
+
+
+counters = Counters()
+
+
+class CountingCursor(sqlite3.Cursor):
+  '''
+  SQLite reports no rowcount for SELECTs, so fetched rows are counted as
+  SQLAlchemy pulls them off the cursor.
+  '''
+
+  def fetchone(self):
+    row = super(CountingCursor, self).fetchone()
+    counters.rows += row is not None
+    return row
+
+  def fetchmany(self, *args):
+    rows = super(CountingCursor, self).fetchmany(*args)
+    counters.rows += len(rows)
+    return rows
+
+  def fetchall(self):
+    rows = super(CountingCursor, self).fetchall()
+    counters.rows += len(rows)
+    return rows
+
+
+class CountingConnection(sqlite3.Connection):
+
+  def cursor(self, factory=CountingCursor):
+    return super(CountingConnection, self).cursor(factory)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  counters.queries += 1
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  # psycopg2 buffers result sets client-side, so rowcount is the number of
+  # rows the statement returned.
+  if conn.dialect.name != 'sqlite' and cursor.description is not None and cursor.rowcount > 0:
+    counters.rows += cursor.rowcount
+
+
+def requests_for(args):
+  '''
+  One request factory per endpoint. Each takes the iteration number and
+  returns (method, path, form data). Every endpoint in app.url_map must
+  be listed here so new routes can't silently escape the benchmark.
+  '''
+  venue = lambda i: i % args.venues + 1
+  artist = lambda i: i % args.artists + 1
+  venue_form = lambda i: {'name': 'Benchmark Venue %d' % i, 'genres': ['Jazz', 'Folk'],
+    'address': '1015 Folsom Street', 'city': 'San Francisco', 'state': 'CA',
+    'phone': '123-123-1234', 'facebook_link': 'https://www.facebook.com/fyyur'}
+  artist_form = lambda i: {'name': 'Benchmark Artist %d' % i, 'genres': ['Jazz'],
+    'city': 'San Francisco', 'state': 'CA', 'phone': '326-123-5000',
+    'facebook_link': 'https://www.facebook.com/fyyur'}
+  # Deletes walk down from the highest venue id, away from the ids the
+  # read routes use first.
+  deleted = count(args.venues, -1)
+  return {
+    'index': lambda i: ('GET', '/', None),
+    'venues': lambda i: ('GET', '/venues', None),
+    'search_venues': lambda i: ('POST', '/venues/search', {'search_term': 'venue %d' % venue(i)}),
+    'show_venue': lambda i: ('GET', '/venues/%d' % venue(i), None),
+    'create_venue_form': lambda i: ('GET', '/venues/create', None),
+    'create_venue_submission': lambda i: ('POST', '/venues/create', venue_form(i)),
+    'edit_venue': lambda i: ('GET', '/venues/%d/edit' % venue(i), None),
+    'edit_venue_submission': lambda i: ('POST', '/venues/%d/edit' % venue(i), venue_form(i)),
+    'delete_venue': lambda i: ('DELETE', '/venues/%d' % next(deleted), None),
+    'delete_venues_by_id': lambda i: ('DELETE', '/venues?id=%d&id=%d' % (next(deleted), next(deleted)), None),
+    'artists': lambda i: ('GET', '/artists', None),
+    'search_artists': lambda i: ('POST', '/artists/search', {'search_term': 'artist %d' % artist(i)}),
+    'show_artist': lambda i: ('GET', '/artists/%d' % artist(i), None),
+    'create_artist_form': lambda i: ('GET', '/artists/create', None),
+    'create_artist_submission': lambda i: ('POST', '/artists/create', artist_form(i)),
+    'edit_artist': lambda i: ('GET', '/artists/%d/edit' % artist(i), None),
+    'edit_artist_submission': lambda i: ('POST', '/artists/%d/edit' % artist(i), artist_form(i)),
+    'shows': lambda i: ('GET', '/shows', None),
+    'create_shows': lambda i: ('GET', '/shows/create', None),
+    'create_show_submission': lambda i: ('POST', '/shows/create', {'venue_id': venue(i),
+      'artist_id': artist(i), 'start_time': '2035-04-01 20:00:00'}),
+    'static': lambda i: ('GET', '/static/css/main.css', None),
+    'metrics': lambda i: ('GET', '/metrics', None),
+  }
+
+
+def percentile(values, fraction):
+  values = sorted(values)
+  return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def measure(client, request, iterations, warmup):
+  for i in range(warmup):
+    method, path, data = request(i)
+    client.open(path, method=method, data=data)
+
+  latencies = []
+  statuses = {}
+  queries = rows = 0
+  for i in range(warmup, warmup + iterations):
+    method, path, data = request(i)
+    counters.queries = counters.rows = 0
+    started = time.perf_counter()
+    response = client.open(path, method=method, data=data)
+    latencies.append((time.perf_counter() - started) * 1000)
+    response.close()
+    queries += counters.queries
+    rows += counters.rows
+    statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+  return {
+    'method': method,
+    'requests': iterations,
+    'p50_ms': round(percentile(latencies, 0.50), 3),
+    'p95_ms': round(percentile(latencies, 0.95), 3),
+    'mean_ms': round(sum(latencies) / len(latencies), 3),
+    'queries_per_request': round(queries / float(iterations), 2),
+    'rows_per_request': round(rows / float(iterations), 2),
+    'status_codes': statuses
+  }
+
+
+def compare(previous, current):
+  print('\n%-26s %22s %22s %18s' % ('route', 'p50 ms (before→now)', 'p95 ms (before→now)', 'queries/req'))
+  for endpoint, now in sorted(current['routes'].items()):
+    before = previous['routes'].get(endpoint)
+    if before is None:
+      continue
+    print('%-26s %10.2f → %9.2f %10.2f → %9.2f %7.1f → %7.1f' % (endpoint,
+      before['p50_ms'], now['p50_ms'], before['p95_ms'], now['p95_ms'],
+      before['queries_per_request'], now['queries_per_request']))
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--venues', type=int, default=1000)
+  parser.add_argument('--artists', type=int, default=1000)
+  parser.add_argument('--shows', type=int, default=20000)
+  parser.add_argument('--requests', type=int, default=50, help='measured requests per route')
+  parser.add_argument('--warmup', type=int, default=2, help='unmeasured requests per route')
+  parser.add_argument('--routes', nargs='*', help='endpoints to run (default: all)')
+  parser.add_argument('--no-cache', action='store_true', help='bypass the page cache')
+  parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+  parser.add_argument('--output', help='write the results as JSON to this file')
+  parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+  args = parser.parse_args()
+  # flask_wtf.Form warns on every form render, which would drown the report.
+  warnings.simplefilter('ignore', DeprecationWarning)
+
+  directory = tempfile.mkdtemp(prefix='fyyur-bench-')
+  try:
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_url or \
+      'sqlite:///' + os.path.join(directory, 'fyyur.db')
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+      app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'factory': CountingConnection}}
+    if args.no_cache:
+      cache.backend = NullCache()
+
+    requests = requests_for(args)
+    missing = set(rule.endpoint for rule in app.url_map.iter_rules()) - set(requests)
+    if missing:
+      raise SystemExit('No benchmark request defined for: %s' % ', '.join(sorted(missing)))
+    endpoints = args.routes or sorted(requests)
+
+    with app.app_context():
+      started = time.monotonic()
+      dataset.seed(args.venues, args.artists, args.shows)
+      print('seeded %d venues, %d artists, %d shows in %.1fs' % (
+        args.venues, args.artists, args.shows, time.monotonic() - started))
+      event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+      event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
+
+    results = {
+      'meta': {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+        'venues': args.venues,
+        'artists': args.artists,
+        'shows': args.shows,
+        'requests': args.requests,
+        'warmup': args.warmup,
+        'cache': not args.no_cache,
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__
+      },
+      'routes': {}
+    }
+    print('\n%-26s %6s %9s %9s %9s %9s' % ('route', 'method', 'p50 ms', 'p95 ms', 'queries', 'rows'))
+    client = app.test_client()
+    for endpoint in endpoints:
+      result = measure(client, requests[endpoint], args.requests, args.warmup)
+      results['routes'][endpoint] = result
+      print('%-26s %6s %9.2f %9.2f %9.1f %9.1f' % (endpoint, result['method'],
+        result['p50_ms'], result['p95_ms'], result['queries_per_request'], result['rows_per_request']))
+
+    if args.output:
+      with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    if args.compare:
+      with open(args.compare) as file:
+        compare(json.load(file), results)
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  main()
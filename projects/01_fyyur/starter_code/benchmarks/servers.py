@@ -0,0 +1,173 @@
+'''
+Throughput of the read-heavy routes under a threaded WSGI server and
+under the ASGI entry point, with the same number of worker processes.
+
+Seeds a synthetic dataset, starts gunicorn (WORKERS processes x THREADS
+threads) and then uvicorn (WORKERS processes) on app.py/asgi.py, and hits
+/venues, /venues/<id>, /artists/<id> and /shows with CONCURRENCY
+connections for DURATION seconds each. The page cache is off so every
+request reaches the database. The async path only pays off when queries
+wait on the network, so point it at Postgres for meaningful numbers:
+
+    $ python -m benchmarks.servers --database-url postgresql://localhost/fyyur_bench
+'''
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import count
+
+from app import app
+from benchmarks import dataset
+from benchmarks.routes import percentile
+
+ROUTES = ('venues', 'show_venue', 'show_artist', 'shows')
+
+
+def server_command(mode, port, args):
+  if mode == 'wsgi':
+    return [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers),
+      '--threads', str(args.threads), '--bind', '127.0.0.1:%d' % port, 'app:app']
+  return [sys.executable, '-m', 'uvicorn', '--workers', str(args.workers),
+    '--host', '127.0.0.1', '--port', str(port), '--no-access-log', 'asgi:application']
+
+
+def free_port():
+  with socket.socket() as sock:
+    sock.bind(('127.0.0.1', 0))
+    return sock.getsockname()[1]
+
+
+def wait_for(port, process, timeout=30):
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline:
+    if process.poll() is not None:
+      raise SystemExit('server exited with status %d' % process.returncode)
+    try:
+      socket.create_connection(('127.0.0.1', port), timeout=1).close()
+      return
+    except OSError:
+      time.sleep(0.1)
+  raise SystemExit('server did not start listening on %d' % port)
+
+
+async def fetch(port, path):
+  reader, writer = await asyncio.open_connection('127.0.0.1', port)
+  try:
+    writer.write(('GET %s HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n' % path).encode())
+    await writer.drain()
+    response = await reader.read()
+  finally:
+    writer.close()
+  return int(response.split(b' ', 2)[1])
+
+
+async def drive(port, paths, concurrency, duration):
+  '''
+  `concurrency` clients issuing requests back to back until `duration`
+  seconds have passed. Returns (latencies in ms, status code counts).
+  '''
+  latencies = []
+  statuses = {}
+  deadline = time.monotonic() + duration
+  next_path = count()
+
+  async def client():
+    while time.monotonic() < deadline:
+      path = paths[next(next_path) % len(paths)]
+      started = time.perf_counter()
+      try:
+        status = str(await fetch(port, path))
+      except OSError:
+        status = 'error'
+      latencies.append((time.perf_counter() - started) * 1000)
+      statuses[status] = statuses.get(status, 0) + 1
+
+  await asyncio.gather(*[client() for _ in range(concurrency)])
+  return latencies, statuses
+
+
+def paths_for(endpoint, args):
+  ids = range(1, min(args.venues, args.artists, 100) + 1)
+  return {
+    'venues': ['/venues'],
+    'show_venue': ['/venues/%d' % id for id in ids],
+    'show_artist': ['/artists/%d' % id for id in ids],
+    'shows': ['/shows']
+  }[endpoint]
+
+
+def measure(mode, args, env):
+  port = free_port()
+  process = subprocess.Popen(server_command(mode, port, args), env=env,
+    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  try:
+    wait_for(port, process)
+    results = {}
+    for endpoint in args.routes:
+      paths = paths_for(endpoint, args)
+      asyncio.run(drive(port, paths, args.concurrency, 1))
+      latencies, statuses = asyncio.run(drive(port, paths, args.concurrency, args.duration))
+      results[endpoint] = {
+        'requests_per_second': round(len(latencies) / float(args.duration), 1),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'status_codes': statuses
+      }
+    return results
+  finally:
+    process.terminate()
+    process.wait()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--venues', type=int, default=1000)
+  parser.add_argument('--artists', type=int, default=1000)
+  parser.add_argument('--shows', type=int, default=20000)
+  parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes for both servers')
+  parser.add_argument('--threads', type=int, default=8, help='threads per WSGI worker')
+  parser.add_argument('--concurrency', type=int, default=64, help='concurrent client connections')
+  parser.add_argument('--duration', type=float, default=10, help='measured seconds per route')
+  parser.add_argument('--routes', nargs='*', default=list(ROUTES), choices=ROUTES)
+  parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+  parser.add_argument('--output', help='write the results as JSON to this file')
+  args = parser.parse_args()
+
+  directory = tempfile.mkdtemp(prefix='fyyur-bench-')
+  try:
+    database_url = args.database_url or 'sqlite:///' + os.path.join(directory, 'fyyur.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    with app.app_context():
+      dataset.seed(args.venues, args.artists, args.shows)
+
+    env = dict(os.environ, DATABASE_URL=database_url, CACHE_BACKEND='cache.NullCache')
+    results = {'meta': {'database': database_url.split(':')[0], 'workers': args.workers,
+      'threads': args.threads, 'concurrency': args.concurrency, 'duration': args.duration}}
+    for mode in ('wsgi', 'asgi'):
+      results[mode] = measure(mode, args, env)
+
+    print('\n%-12s %14s %14s %8s %16s %16s' % ('route', 'wsgi req/s', 'asgi req/s', 'ratio',
+      'wsgi p95 ms', 'asgi p95 ms'))
+    for endpoint in args.routes:
+      wsgi, asgi = results['wsgi'][endpoint], results['asgi'][endpoint]
+      print('%-12s %14.1f %14.1f %7.2fx %16.2f %16.2f' % (endpoint,
+        wsgi['requests_per_second'], asgi['requests_per_second'],
+        asgi['requests_per_second'] / max(wsgi['requests_per_second'], 0.1),
+        wsgi['p95_ms'], asgi['p95_ms']))
+
+    if args.output:
+      with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  main()
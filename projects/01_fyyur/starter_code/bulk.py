@@ -0,0 +1,198 @@
+#----------------------------------------------------------------------------#
+# Streaming bulk import/export of table rows.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime, timezone
+from itertools import islice
+
+import dateutil.parser
+import sqlalchemy as sa
+
+FORMATS = ('csv', 'ndjson')
+
+
+def file_format(path, format=None):
+  '''
+  The format of a data file: `format` if given, else its extension
+  (.csv, or .ndjson/.jsonl for newline-delimited JSON).
+  '''
+  if format:
+    return format
+  extension = os.path.splitext(path)[1].lower()
+  if extension == '.csv':
+    return 'csv'
+  if extension in ('.ndjson', '.jsonl'):
+    return 'ndjson'
+  raise ValueError('Cannot tell the format of %s, pass one of %s' % (path, ', '.join(FORMATS)))
+
+
+def read_records(file, format):
+  '''
+  Lazily yields one dict per CSV row or NDJSON line of an open text file.
+  '''
+  if format == 'csv':
+    for record in csv.DictReader(file):
+      yield record
+  else:
+    for line in file:
+      if line.strip():
+        yield json.loads(line)
+
+
+def parse_datetime(value):
+  # fromisoformat is an order of magnitude faster than dateutil and covers
+  # what exports write; dateutil handles anything else.
+  try:
+    return datetime.fromisoformat(value)
+  except ValueError:
+    return dateutil.parser.parse(value)
+
+
+def coerce(table, record):
+  '''
+  Converts a raw record (CSV gives strings only) into a row for `table`:
+  empty strings become NULL and values are parsed according to the
+  column type. Fields that aren't columns are passed through untouched.
+  '''
+  row = dict(record)
+  for column in table.c:
+    value = row.get(column.name)
+    if isinstance(value, str):
+      value = value.strip()
+    if value is None or value == '':
+      if column.name in row:
+        row[column.name] = None
+      continue
+    column_type = getattr(column.type, 'impl', column.type)
+    if isinstance(column_type, sa.Boolean) and isinstance(value, str):
+      value = value.lower() in ('1', 't', 'true', 'y', 'yes')
+    elif isinstance(column_type, sa.Integer):
+      value = int(value)
+    elif isinstance(column_type, sa.DateTime) and isinstance(value, str):
+      value = parse_datetime(value)
+      if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    row[column.name] = value
+  return row
+
+
+def batched(records, size):
+  records = iter(records)
+  while True:
+    batch = list(islice(records, size))
+    if not batch:
+      return
+    yield batch
+
+
+class Progress(object):
+  '''
+  Counts rows as batches complete and reports the running rows/second
+  through `report(rows, rate)`.
+  '''
+
+  def __init__(self, report=None):
+    self.report = report
+    self.rows = 0
+    self.started = time.monotonic()
+
+  @property
+  def rate(self):
+    return self.rows / max(time.monotonic() - self.started, 1e-9)
+
+  def advance(self, rows):
+    self.rows += rows
+    if self.report is not None:
+      self.report(self.rows, self.rate)
+
+
+def copy_rows(connection, table, rows):
+  '''
+  Loads rows into `table` with COPY ... FROM STDIN, streaming them as CSV.
+  Only used on Postgres through psycopg2.
+  '''
+  columns = list(rows[0])
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  for row in rows:
+    writer.writerow(['\\N' if row[column] is None else row[column] for column in columns])
+  buffer.seek(0)
+  cursor = connection.connection.cursor()
+  try:
+    cursor.copy_expert('COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')' % (
+      connection.dialect.identifier_preparer.format_table(table),
+      ', '.join(connection.dialect.identifier_preparer.quote(column) for column in columns)
+    ), buffer)
+  finally:
+    cursor.close()
+
+
+def supports_copy(connection):
+  return connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2'
+
+
+def load(engine, table, records, batch_size=5000, prepare=None, after_batch=None, progress=None):
+  '''
+  Inserts `records` into `table`, `batch_size` rows per transaction, with
+  COPY on Postgres and a single executemany INSERT elsewhere. `prepare`
+  maps a record to the row to insert; `after_batch(connection, rows)` runs
+  in the batch's transaction (e.g. to write link table rows).
+  '''
+  progress = progress or Progress()
+  with engine.connect() as connection:
+    use_copy = supports_copy(connection)
+    for batch in batched(records, batch_size):
+      rows = [prepare(record) for record in batch] if prepare else batch
+      columns = [column.name for column in table.c if column.name in rows[0]]
+      values = [dict((column, row.get(column)) for column in columns) for row in rows]
+      with connection.begin():
+        if use_copy:
+          copy_rows(connection, table, values)
+        else:
+          connection.execute(table.insert(), values)
+        if after_batch is not None:
+          after_batch(connection, rows)
+      progress.advance(len(rows))
+
+    if connection.dialect.name == 'postgresql' and 'id' in table.c:
+      # Rows were loaded with explicit ids, move the sequence past them.
+      with connection.begin():
+        connection.exec_driver_sql(
+          "SELECT setval(pg_get_serial_sequence('%s', 'id'), COALESCE(MAX(id), 1)) FROM %s"
+          % (table.name, connection.dialect.identifier_preparer.format_table(table)))
+  return progress
+
+
+def dump(engine, query, file, format, batch_size=5000, extend=None, progress=None):
+  '''
+  Streams the rows of `query` to an open text file as CSV or NDJSON,
+  fetching `batch_size` rows at a time through a server-side cursor where
+  the driver supports one. `extend(connection, rows)` can add fields to
+  each batch of row dicts before they are written.
+  '''
+  progress = progress or Progress()
+  with engine.connect() as connection:
+    result = connection.execution_options(stream_results=True).execute(query)
+    writer = None
+    while True:
+      rows = [dict(row._mapping) for row in result.fetchmany(batch_size)]
+      if not rows:
+        break
+      if extend is not None:
+        extend(connection, rows)
+      for row in rows:
+        if format == 'csv':
+          if writer is None:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+          writer.writerow(dict((key, json.dumps(value) if isinstance(value, list) else value)
+            for key, value in row.items()))
+        else:
+          file.write(json.dumps(row, default=str) + '\n')
+      progress.advance(len(rows))
+  return progress
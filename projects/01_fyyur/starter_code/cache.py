@@ -0,0 +1,209 @@
+#----------------------------------------------------------------------------#
+# Read-through cache for page data.
+#----------------------------------------------------------------------------#
+
+import json
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from werkzeug.utils import import_string
+
+
+class CacheBackend(object):
+  '''
+  Storage the Cache reads through. A shared store (e.g. a Redis stand-in)
+  only has to implement these methods; `get` returns None on a miss, so
+  None itself is never stored.
+  '''
+
+  def get(self, key):
+    raise NotImplementedError
+
+  def set(self, key, value, ttl):
+    raise NotImplementedError
+
+  def delete(self, *keys):
+    raise NotImplementedError
+
+  def clear(self):
+    raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+  '''
+  Backend that never stores anything, for turning the cache off.
+  '''
+
+  def get(self, key):
+    return None
+
+  def set(self, key, value, ttl):
+    pass
+
+  def delete(self, *keys):
+    pass
+
+  def clear(self):
+    pass
+
+
+class LRUCache(CacheBackend):
+  '''
+  In-process backend: a bounded, thread-safe LRU whose entries also expire
+  `ttl` seconds after they were set. Each worker process has its own copy.
+  '''
+
+  def __init__(self, max_entries=1024):
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._lock = Lock()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      expires_at, value = entry
+      if expires_at <= time.monotonic():
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, ttl):
+    with self._lock:
+      self._entries[key] = (time.monotonic() + ttl, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def delete(self, *keys):
+    with self._lock:
+      for key in keys:
+        self._entries.pop(key, None)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+
+class FragmentCache(Extension):
+  '''
+  Jinja tag caching the rendered output of a template block:
+
+    {% cache 'venue:%s' % venue.id %} ... {% endcache %}
+    {% cache ('shows', request.args.get('after')), 600 %} ... {% endcache %}
+
+  The key is a page cache key, or a tuple of one followed by values the
+  output varies with. Deleting that page key from the Cache also
+  invalidates its fragments, so the write handlers' invalidations cover both. The
+  optional ttl defaults to CACHE_TTL.
+  '''
+  tags = set(['cache'])
+
+  def parse(self, parser):
+    lineno = next(parser.stream).lineno
+    args = [parser.parse_expression()]
+    if parser.stream.skip_if('comma'):
+      args.append(parser.parse_expression())
+    else:
+      args.append(nodes.Const(None))
+    args.append(nodes.Const('%s:%d' % (parser.name, lineno)))
+    body = parser.parse_statements(['name:endcache'], drop_needle=True)
+    return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+  def _render(self, key, ttl, block, caller):
+    return Markup(self.environment.fragment_cache.fragment(key, ttl, block, caller))
+
+
+class Cache(object):
+  '''
+  Flask extension wrapping a CacheBackend. Configured with CACHE_BACKEND
+  (import path of a CacheBackend class), CACHE_TTL and CACHE_MAX_ENTRIES.
+  Also registers the {% cache %} template tag (see FragmentCache).
+  '''
+
+  def __init__(self, app=None):
+    self.backend = NullCache()
+    self.ttl = 0
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('CACHE_BACKEND', 'cache.LRUCache')
+    app.config.setdefault('CACHE_TTL', 300)
+    app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+
+    backend = import_string(app.config['CACHE_BACKEND'])
+    if backend is LRUCache:
+      self.backend = LRUCache(app.config['CACHE_MAX_ENTRIES'])
+    else:
+      self.backend = backend()
+    self.ttl = app.config['CACHE_TTL']
+    app.jinja_env.add_extension(FragmentCache)
+    app.jinja_env.fragment_cache = self
+    app.extensions['cache'] = self
+
+  def get_or_set(self, key, creator):
+    '''
+    Returns the cached value for `key`, calling `creator` and caching its
+    result on a miss. A None result is returned but not cached.
+    '''
+    value = self.backend.get(key)
+    if value is None:
+      value = creator()
+      if value is not None:
+        self.backend.set(key, value, self.ttl)
+    return value
+
+  def get(self, key):
+    return self.backend.get(key)
+
+  def set(self, key, value):
+    self.backend.set(key, value, self.ttl)
+
+  def fragment(self, key, ttl, block, render):
+    '''
+    Cached output of template block `block` for `key`, rendering it with
+    `render` on a miss. Fragment keys include the page key's current
+    generation (see generation()), so deleting the page key orphans them.
+    '''
+    if isinstance(key, (tuple, list)):
+      key, vary = key[0], list(key[1:])
+    else:
+      vary = []
+    ttl = ttl or self.ttl
+    fragment_key = 'fragment:%s:%s:%s:%s' % (key, self.generation(key, ttl), block,
+      json.dumps(vary, default=str))
+    value = self.backend.get(fragment_key)
+    if value is None:
+      value = str(render())
+      self.backend.set(fragment_key, value, ttl)
+    return value
+
+  def generation(self, key, ttl):
+    '''
+    Random token naming the current set of fragments of page key `key`.
+    A missing token, whether deleted, evicted or expired, is replaced
+    with a new one, so stale fragments can never be found again; they
+    age out of the backend on their own.
+    '''
+    generation = self.backend.get('generation:' + key)
+    if generation is None:
+      generation = uuid.uuid4().hex
+      self.backend.set('generation:' + key, generation, max(ttl, self.ttl))
+    return generation
+
+  def delete(self, *keys):
+    '''
+    Deletes `keys` and, by dropping their generations, every template
+    fragment cached under them.
+    '''
+    self.backend.delete(*(list(keys) + ['generation:' + key for key in keys]))
+
+  def clear(self):
+    self.backend.clear()
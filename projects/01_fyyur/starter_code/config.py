@@ -10,5 +10,65 @@ DEBUG = True
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://jamesmiller@localhost:5432/fyyur'
-SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://jamesmiller@localhost:5432/fyyur')
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Locale used by the `datetime` template filter.
+DATETIME_LOCALE = 'en_US'
+
+# Listing pages (/venues, /artists, /shows) are keyset paginated; ?limit=
+# can ask for a different page size up to MAX_PAGE_SIZE.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Bulk venue deletion commits every DELETE_CHUNK_SIZE venues (and their
+# shows) so long deletions don't hold locks for their whole run.
+DELETE_CHUNK_SIZE = 500
+
+# Read-through cache for the venue/artist pages and the city listing.
+# CACHE_BACKEND is the import path of a cache.CacheBackend implementation;
+# use 'cache.NullCache' to turn caching off.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'cache.LRUCache')
+CACHE_TTL = 300
+CACHE_MAX_ENTRIES = 1024
+
+# `flask assets build` writes fingerprinted, precompressed copies of static/
+# into static/<ASSETS_FOLDER>; templates link them through asset_url().
+ASSETS_FOLDER = 'dist'
+
+# Per-request SQL instrumentation: a Server-Timing header and a JSON log
+# line per request, with N+1 detection for statements repeated more than
+# SQL_N_PLUS_ONE_THRESHOLD times. Turn it on with SQL_INSTRUMENTATION=1.
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+
+# Warm up templates, Babel, the mappers and the first DB connection when
+# the app is imported instead of on the first requests (also available as
+# `flask warmup`). Compiled templates are shared between processes through
+# TEMPLATE_BYTECODE_CACHE_DIR, if set.
+WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', '').lower() in ('1', 'true', 'yes')
+TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR')
+
+# Database the ASGI entry point (asgi.py) reads through on the event loop;
+# defaults to SQLALCHEMY_DATABASE_URI with asyncpg/aiosqlite as the driver.
+ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+
+
+class ProductionConfig(object):
+  '''
+  Production profile, applied on top of the settings above by starting the
+  app with FYYUR_CONFIG=config.ProductionConfig. Size DB_POOL_SIZE +
+  DB_MAX_OVERFLOW against (workers x threads) and the server's
+  max_connections; /metrics shows how the pool is holding up.
+  '''
+  DEBUG = False
+  SECRET_KEY = os.environ.get('SECRET_KEY', SECRET_KEY)
+
+  DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+  DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+  # Seconds a request waits for a free connection before erroring out.
+  DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+  # Recycle connections before server/proxy idle timeouts drop them.
+  DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+  DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+  DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 5000))
\ No newline at end of file
@@ -1,6 +1,6 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, HiddenField
 from wtforms.validators import DataRequired, AnyOf, URL
 
 class ShowForm(Form):
@@ -116,6 +116,10 @@ class VenueForm(Form):
     facebook_link = StringField(
         'facebook_link', validators=[URL()]
     )
+    # Row version and the values the edit page was rendered with, so an
+    # edit only writes what changed and can't overwrite a newer edit.
+    version = HiddenField('version')
+    snapshot = HiddenField('snapshot')
 
 class ArtistForm(Form):
     name = StringField(
@@ -216,5 +220,7 @@ class ArtistForm(Form):
         # TODO implement enum restriction
         'facebook_link', validators=[URL()]
     )
+    version = HiddenField('version')
+    snapshot = HiddenField('snapshot')
 
 # TODO IMPLEMENT NEW ARTIST FORM AND NEW SHOW FORM
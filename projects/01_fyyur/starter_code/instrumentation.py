@@ -0,0 +1,115 @@
+#----------------------------------------------------------------------------#
+# Per-request SQL instrumentation.
+#----------------------------------------------------------------------------#
+
+import json
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestStats(object):
+  '''
+  Statements a single request sent to the database and how long they took.
+  '''
+
+  def __init__(self):
+    self.started = time.perf_counter()
+    self.queries = 0
+    self.db_time = 0.0
+    self.slowest = (0.0, None)
+    self.shapes = Counter()
+
+  def record(self, statement, elapsed):
+    self.queries += 1
+    self.db_time += elapsed
+    self.shapes[statement] += 1
+    if elapsed > self.slowest[0]:
+      self.slowest = (elapsed, statement)
+
+  def repeated(self, threshold):
+    '''
+    Statement shapes run more than `threshold` times: the signature of an
+    N+1 loop. Statements are parameterized, so the SQL text is the shape.
+    '''
+    return [(statement, count) for statement, count in self.shapes.most_common() if count > threshold]
+
+
+class SQLInstrumentation(object):
+  '''
+  Records query count, total DB time, the slowest statement and repeated
+  statement shapes for every request, and reports them as a Server-Timing
+  header and one JSON log line. Enabled with the SQL_INSTRUMENTATION
+  setting, which is checked per request.
+  '''
+
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('SQL_INSTRUMENTATION', False)
+    app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', 5)
+    self.app = app
+
+    # Listening on the Engine class covers the engine Flask-SQLAlchemy
+    # creates lazily; statements outside an instrumented request are ignored.
+    event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+    app.before_request(self.before_request)
+    app.after_request(self.after_request)
+    app.extensions['sql_instrumentation'] = self
+
+  @staticmethod
+  def current():
+    if has_request_context():
+      return g.get('sql_stats')
+    return None
+
+  def before_request(self):
+    if self.app.config['SQL_INSTRUMENTATION']:
+      g.sql_stats = RequestStats()
+
+  def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which a failing statement drops, rather
+    # than on the pooled connection, where it would outlive the error.
+    if self.current() is not None:
+      context._sql_started = time.perf_counter()
+
+  def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    stats = self.current()
+    started = getattr(context, '_sql_started', None)
+    if stats is not None and started is not None:
+      stats.record(statement, time.perf_counter() - started)
+
+  def after_request(self, response):
+    stats = self.current()
+    if stats is None:
+      return response
+    total = time.perf_counter() - stats.started
+    threshold = self.app.config['SQL_N_PLUS_ONE_THRESHOLD']
+    repeated = stats.repeated(threshold)
+
+    response.headers.add('Server-Timing', 'db;dur=%.2f;desc="%d queries", app;dur=%.2f' % (
+      stats.db_time * 1000, stats.queries, (total - stats.db_time) * 1000))
+
+    line = json.dumps({
+      'event': 'sql',
+      'method': request.method,
+      'path': request.path,
+      'endpoint': request.endpoint,
+      'status': response.status_code,
+      'queries': stats.queries,
+      'db_ms': round(stats.db_time * 1000, 3),
+      'total_ms': round(total * 1000, 3),
+      'slowest_ms': round(stats.slowest[0] * 1000, 3),
+      'slowest_statement': stats.slowest[1],
+      'n_plus_one': [{'statement': statement, 'count': count} for statement, count in repeated]
+    })
+    if repeated:
+      self.app.logger.warning(line)
+    else:
+      self.app.logger.info(line)
+    return response
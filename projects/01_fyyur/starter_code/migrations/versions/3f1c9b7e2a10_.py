@@ -0,0 +1,32 @@
+"""trigram indexes for venue and artist name search
+
+Revision ID: 3f1c9b7e2a10
+Revises: 852c889490dd
+Create Date: 2026-10-18 09:12:41.230518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9b7e2a10'
+down_revision = '852c889490dd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # search_venues/search_artists run ILIKE '%term%', which only an index
+    # built on pg_trgm can serve. Other dialects get a plain index on name.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_venue_name_trgm', 'venue', ['name'], unique=False,
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_artist_name_trgm', 'artist', ['name'], unique=False,
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_artist_name_trgm', table_name='artist')
+    op.drop_index('ix_venue_name_trgm', table_name='venue')
@@ -0,0 +1,38 @@
+"""precomputed upcoming show counters on venue and artist
+
+Revision ID: 4c8f2a6d1e93
+Revises: e5a81f3c6d42
+Create Date: 2026-10-18 15:02:37.481926
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8f2a6d1e93'
+down_revision = 'e5a81f3c6d42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venue', sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('artist', sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('show', sa.Column('is_upcoming', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    op.execute('UPDATE show SET is_upcoming = start_time > now()')
+    for entity in ('venue', 'artist'):
+        op.execute('UPDATE {0} SET upcoming_shows_count = ('
+                   'SELECT count(*) FROM show WHERE show.{0}_id = {0}.id AND show.is_upcoming)'.format(entity))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_show_upcoming_start_time', 'show', ['start_time'],
+            unique=False, postgresql_where=sa.text('is_upcoming'), postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_show_upcoming_start_time', table_name='show')
+    op.drop_column('show', 'is_upcoming')
+    op.drop_column('artist', 'upcoming_shows_count')
+    op.drop_column('venue', 'upcoming_shows_count')
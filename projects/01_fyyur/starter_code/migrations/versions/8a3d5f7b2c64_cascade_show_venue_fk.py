@@ -0,0 +1,31 @@
+"""delete shows together with their venue
+
+Revision ID: 8a3d5f7b2c64
+Revises: 4c8f2a6d1e93
+Create Date: 2026-10-18 15:48:11.205734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3d5f7b2c64'
+down_revision = '4c8f2a6d1e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NOT VALID skips the scan of existing shows while the table is locked;
+    # VALIDATE then runs in its own transaction, with a lock that lets writes through.
+    op.drop_constraint('show_venue_id_fkey', 'show', type_='foreignkey')
+    op.execute('ALTER TABLE show ADD CONSTRAINT show_venue_id_fkey FOREIGN KEY (venue_id) '
+               'REFERENCES venue (id) ON DELETE CASCADE NOT VALID')
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE show VALIDATE CONSTRAINT show_venue_id_fkey')
+
+
+def downgrade():
+    op.drop_constraint('show_venue_id_fkey', 'show', type_='foreignkey')
+    op.create_foreign_key('show_venue_id_fkey', 'show', 'venue', ['venue_id'], ['id'])
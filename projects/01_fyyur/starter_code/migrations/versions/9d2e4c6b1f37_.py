@@ -0,0 +1,93 @@
+"""store show.start_time as a timezone-aware timestamp
+
+Revision ID: 9d2e4c6b1f37
+Revises: 3f1c9b7e2a10
+Create Date: 2026-10-18 10:02:17.904112
+
+"""
+from datetime import timezone
+
+from alembic import op
+import dateutil.parser
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2e4c6b1f37'
+down_revision = '3f1c9b7e2a10'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def to_timestamp(value):
+    start_time = dateutil.parser.parse(value)
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    return start_time
+
+
+def to_string(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def backfill(bind, source, target, convert, batch_size=BATCH_SIZE):
+    '''
+    Copies show.<source> into show.<target> through `convert`, walking the
+    primary key in batches of `batch_size` rows. Only rows whose target is
+    still NULL are touched, so it can be re-run to catch up on rows written
+    while a previous pass was in progress.
+    '''
+    show = sa.table('show', sa.column('id', sa.Integer),
+        sa.column(source), sa.column(target))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select([show.c.id, show.c[source]])
+            .where(show.c.id > last_id)
+            .where(show.c[target].is_(None))
+            .order_by(show.c.id)
+            .limit(batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            show.update()
+            .where(show.c.id == sa.bindparam('show_id'))
+            .values({target: sa.bindparam('value')}),
+            [{'show_id': id, 'value': convert(value)} for id, value in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.add_column('show', sa.Column('start_time_tz', sa.DateTime(timezone=True), nullable=True))
+
+    # Each batch commits on its own so the table is never locked for the
+    # whole conversion; the final pass below picks up stragglers.
+    with op.get_context().autocommit_block():
+        backfill(op.get_bind(), 'start_time', 'start_time_tz', to_timestamp)
+    backfill(op.get_bind(), 'start_time', 'start_time_tz', to_timestamp)
+
+    op.drop_column('show', 'start_time')
+    op.alter_column('show', 'start_time_tz', new_column_name='start_time', nullable=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time'],
+            unique=False, postgresql_concurrently=True)
+        op.create_index('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time'],
+            unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_show_artist_id_start_time', table_name='show')
+    op.drop_index('ix_show_venue_id_start_time', table_name='show')
+
+    op.add_column('show', sa.Column('start_time_str', sa.String(length=120), nullable=True))
+    with op.get_context().autocommit_block():
+        backfill(op.get_bind(), 'start_time', 'start_time_str', to_string)
+    backfill(op.get_bind(), 'start_time', 'start_time_str', to_string)
+
+    op.drop_column('show', 'start_time')
+    op.alter_column('show', 'start_time_str', new_column_name='start_time', nullable=False)
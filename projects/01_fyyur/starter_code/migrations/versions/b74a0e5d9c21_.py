@@ -0,0 +1,32 @@
+"""indexes backing keyset pagination of the listing pages
+
+Revision ID: b74a0e5d9c21
+Revises: 9d2e4c6b1f37
+Create Date: 2026-10-18 11:40:05.117623
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b74a0e5d9c21'
+down_revision = '9d2e4c6b1f37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_venue_state_city_id', 'venue', ['state', 'city', 'id'],
+            unique=False, postgresql_concurrently=True)
+        op.create_index('ix_artist_name_id', 'artist', ['name', 'id'],
+            unique=False, postgresql_concurrently=True)
+        op.create_index('ix_show_start_time_id', 'show', ['start_time', 'id'],
+            unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_show_start_time_id', table_name='show')
+    op.drop_index('ix_artist_name_id', table_name='artist')
+    op.drop_index('ix_venue_state_city_id', table_name='venue')
@@ -0,0 +1,26 @@
+"""row versions for optimistic concurrency on venue and artist edits
+
+Revision ID: d61b9e4a7f05
+Revises: 8a3d5f7b2c64
+Create Date: 2026-10-18 16:31:45.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd61b9e4a7f05'
+down_revision = '8a3d5f7b2c64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venue', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('artist', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    op.drop_column('artist', 'version')
+    op.drop_column('venue', 'version')
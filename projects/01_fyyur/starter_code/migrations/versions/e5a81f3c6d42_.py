@@ -0,0 +1,116 @@
+"""normalize venue and artist genres into a genre table
+
+Revision ID: e5a81f3c6d42
+Revises: b74a0e5d9c21
+Create Date: 2026-10-18 13:25:52.648019
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a81f3c6d42'
+down_revision = 'b74a0e5d9c21'
+branch_labels = None
+depends_on = None
+
+genre = sa.table('genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+
+
+def decode(genres):
+    try:
+        return set(json.loads(genres or '[]'))
+    except ValueError:
+        return set([genres])
+
+
+def backfill(bind, entity):
+    '''
+    Moves the JSON-encoded <entity>.genres strings into <entity>_genre links,
+    creating the genre rows they name.
+    '''
+    source = sa.table(entity, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+    link = sa.table(entity + '_genre',
+        sa.column(entity + '_id', sa.Integer), sa.column('genre_id', sa.Integer))
+
+    names = dict((id, decode(genres)) for id, genres in
+        bind.execute(sa.select([source.c.id, source.c.genres])))
+    known = dict((name, id) for id, name in bind.execute(sa.select([genre.c.id, genre.c.name])))
+    missing = set().union(*names.values()) - set(known) if names else set()
+    if missing:
+        bind.execute(genre.insert(), [{'name': name} for name in sorted(missing)])
+        known = dict((name, id) for id, name in bind.execute(sa.select([genre.c.id, genre.c.name])))
+
+    links = [{entity + '_id': id, 'genre_id': known[name]}
+        for id, values in names.items() for name in values]
+    if links:
+        bind.execute(link.insert(), links)
+
+
+def restore(bind, entity):
+    target = sa.table(entity, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+    link = sa.table(entity + '_genre',
+        sa.column(entity + '_id', sa.Integer), sa.column('genre_id', sa.Integer))
+
+    names = {}
+    rows = bind.execute(sa.select([link.c[entity + '_id'], genre.c.name])
+        .select_from(link.join(genre, link.c.genre_id == genre.c.id)))
+    for id, name in rows:
+        names.setdefault(id, []).append(name)
+    ids = [id for id, in bind.execute(sa.select([target.c.id]))]
+    if ids:
+        bind.execute(
+            target.update().where(target.c.id == sa.bindparam('entity_id'))
+            .values(genres=sa.bindparam('genres')),
+            [{'entity_id': id, 'genres': json.dumps(sorted(names.get(id, [])))} for id in ids]
+        )
+
+
+def upgrade():
+    op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('venue_genre',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_venue_genre_genre_id_venue_id', 'venue_genre', ['genre_id', 'venue_id'], unique=False)
+    op.create_table('artist_genre',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_artist_genre_genre_id_artist_id', 'artist_genre', ['genre_id', 'artist_id'], unique=False)
+
+    backfill(op.get_bind(), 'venue')
+    backfill(op.get_bind(), 'artist')
+
+    op.drop_column('venue', 'genres')
+    op.drop_column('artist', 'genres')
+
+
+def downgrade():
+    op.add_column('artist', sa.Column('genres', sa.VARCHAR(length=120), nullable=True))
+    op.add_column('venue', sa.Column('genres', sa.VARCHAR(length=120), nullable=True))
+
+    restore(op.get_bind(), 'venue')
+    restore(op.get_bind(), 'artist')
+
+    op.alter_column('artist', 'genres', nullable=False)
+    op.alter_column('venue', 'genres', nullable=False)
+    op.drop_index('ix_artist_genre_genre_id_artist_id', table_name='artist_genre')
+    op.drop_table('artist_genre')
+    op.drop_index('ix_venue_genre_genre_id_venue_id', table_name='venue_genre')
+    op.drop_table('venue_genre')
+    op.drop_table('genre')
@@ -0,0 +1,28 @@
+"""updated_at timestamps on venue and artist for conditional GETs
+
+Revision ID: f3e7a1c9b528
+Revises: d61b9e4a7f05
+Create Date: 2026-10-18 17:56:20.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3e7a1c9b528'
+down_revision = 'd61b9e4a7f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venue', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False,
+        server_default=sa.func.now()))
+    op.add_column('artist', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False,
+        server_default=sa.func.now()))
+
+
+def downgrade():
+    op.drop_column('artist', 'updated_at')
+    op.drop_column('venue', 'updated_at')
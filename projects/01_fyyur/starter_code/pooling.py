@@ -0,0 +1,96 @@
+#----------------------------------------------------------------------------#
+# Connection pool settings and health metrics.
+#----------------------------------------------------------------------------#
+
+import time
+from threading import Lock
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.pool import QueuePool
+
+# config setting -> create_engine argument
+POOL_SETTINGS = (
+  ('DB_POOL_SIZE', 'pool_size'),
+  ('DB_MAX_OVERFLOW', 'max_overflow'),
+  ('DB_POOL_TIMEOUT', 'pool_timeout'),
+  ('DB_POOL_RECYCLE', 'pool_recycle'),
+  ('DB_POOL_PRE_PING', 'pool_pre_ping'),
+)
+
+
+class TimedQueuePool(QueuePool):
+  '''
+  QueuePool that keeps track of how long checkouts wait for a connection,
+  including the time spent opening new ones.
+  '''
+
+  def __init__(self, *args, **kw):
+    super(TimedQueuePool, self).__init__(*args, **kw)
+    self._stats_lock = Lock()
+    self.checkouts = 0
+    self.wait_time = 0.0
+    self.max_wait_time = 0.0
+
+  def _do_get(self):
+    started = time.perf_counter()
+    try:
+      return super(TimedQueuePool, self)._do_get()
+    finally:
+      waited = time.perf_counter() - started
+      with self._stats_lock:
+        self.checkouts += 1
+        self.wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+
+
+def pool_options(config):
+  '''
+  create_engine arguments built from the DB_* settings that are set, plus
+  a statement timeout (Postgres only) from DB_STATEMENT_TIMEOUT_MS.
+  '''
+  options = {'poolclass': TimedQueuePool}
+  for setting, argument in POOL_SETTINGS:
+    if config.get(setting) is not None:
+      options[argument] = config[setting]
+  if config.get('DB_STATEMENT_TIMEOUT_MS'):
+    options['connect_args'] = {'options': '-c statement_timeout=%d' % config['DB_STATEMENT_TIMEOUT_MS']}
+  return options
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+  '''
+  SQLAlchemy that applies pool_options() to every engine except SQLite's,
+  whose pools Flask-SQLAlchemy picks itself.
+  '''
+
+  def apply_driver_hacks(self, app, sa_url, options):
+    if sa_url.get_backend_name() != 'sqlite':
+      for argument, value in pool_options(app.config).items():
+        if argument == 'connect_args':
+          value = dict(value, **options.get('connect_args', {}))
+        options.setdefault(argument, value)
+    return super(PooledSQLAlchemy, self).apply_driver_hacks(app, sa_url, options)
+
+
+def pool_status(engine):
+  '''
+  Snapshot of the engine's pool for the /metrics endpoint.
+  '''
+  pool = engine.pool
+  status = {'class': type(pool).__name__, 'status': pool.status()}
+  if isinstance(pool, QueuePool):
+    status.update({
+      'size': pool.size(),
+      'max_overflow': pool._max_overflow,
+      'checked_out': pool.checkedout(),
+      'idle': pool.checkedin(),
+      'overflow': max(pool.overflow(), 0)
+    })
+  if isinstance(pool, TimedQueuePool):
+    with pool._stats_lock:
+      status.update({
+        'checkouts': pool.checkouts,
+        'wait_ms_total': round(pool.wait_time * 1000, 3),
+        'wait_ms_avg': round(pool.wait_time * 1000 / pool.checkouts, 3) if pool.checkouts else 0.0,
+        'wait_ms_max': round(pool.max_wait_time * 1000, 3)
+      })
+  return status
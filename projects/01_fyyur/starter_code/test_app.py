@@ -0,0 +1,545 @@
+import asyncio
+import base64
+import gzip
+import html
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from flask import render_template_string
+from sqlalchemy import create_engine, event
+
+from asgi import AsyncApp
+from cache import LRUCache
+from pooling import TimedQueuePool, pool_options, pool_status
+from app import app, db, cache, static_assets, Genre, Venue, Artist, Show, venue_areas, show_page, format_datetime,\
+    roll_over_upcoming_counts
+
+
+class FyyurTestCase(unittest.TestCase):
+    """This class represents the fyyur test case"""
+
+    def setUp(self):
+        """Define test variables and initialize app."""
+        app.config["TESTING"] = True
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        self.client = app.test_client
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        cache.clear()
+
+    def tearDown(self):
+        """Executed after reach test"""
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    @contextmanager
+    def count_queries(self):
+        """Collects every statement sent to the database inside the block"""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        """Fails if the block sends more than `limit` statements to the database"""
+        with self.count_queries() as statements:
+            yield statements
+        self.assertLessEqual(len(statements), limit,
+                             "%d queries issued, expected at most %d:\n%s"
+                             % (len(statements), limit, "\n".join(statements)))
+
+    def seed(self, venues, shows_per_venue, start_time=datetime(2999, 1, 1, 20)):
+        jazz = Genre.query.filter_by(name="Jazz").first() or Genre(name="Jazz")
+        artist = Artist(name="The Wild Sax Band", genres=[jazz], city="San Francisco",
+                        state="CA", phone="326-123-5000")
+        db.session.add(artist)
+        for i in range(venues):
+            venue = Venue(name="Venue %d" % i, genres=[jazz], address="1 Main St",
+                          city="City %d" % (i % 3), state="CA", phone="123-123-1234")
+            db.session.add(venue)
+            for _ in range(shows_per_venue):
+                db.session.add(Show(venue=venue, artist=artist, start_time=start_time))
+        db.session.commit()
+
+    def test_venues_groups_by_city_with_upcoming_counts(self):
+        self.seed(venues=3, shows_per_venue=2)
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime(2000, 1, 1, 20)))
+        db.session.commit()
+
+        res = self.client().get("/venues")
+        self.assertEqual(res.status_code, 200)
+
+        areas, next_cursor = venue_areas()
+        self.assertIsNone(next_cursor)
+        self.assertEqual([area["city"] for area in areas], ["City 0", "City 1", "City 2"])
+        self.assertEqual(areas[0]["venues"][0]["num_upcoming_shows"], 2)
+
+    def test_venues_query_count_is_constant(self):
+        self.seed(venues=5, shows_per_venue=2)
+        with self.count_queries() as small:
+            self.client().get("/venues")
+
+        self.seed(venues=50, shows_per_venue=10)
+        cache.clear()
+        with self.count_queries() as large:
+            self.client().get("/venues")
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(large), 1)
+
+    def test_show_venue_partitions_shows_without_per_show_queries(self):
+        self.seed(venues=1, shows_per_venue=20)
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime(2000, 1, 1, 20)))
+        db.session.commit()
+
+        with self.assertMaxQueries(2):
+            res = self.client().get("/venues/1")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"20 Upcoming Shows", res.data)
+        self.assertIn(b"1 Past Show", res.data)
+
+    def test_show_artist_partitions_shows_without_per_show_queries(self):
+        self.seed(venues=10, shows_per_venue=5)
+
+        with self.assertMaxQueries(2):
+            res = self.client().get("/artists/1")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"50 Upcoming Shows", res.data)
+
+    def test_show_venue_not_found(self):
+        res = self.client().get("/venues/1000")
+        self.assertEqual(res.status_code, 404)
+
+    def test_search_venues_matches_substring_in_one_query(self):
+        self.seed(venues=12, shows_per_venue=1)
+
+        with self.assertMaxQueries(1):
+            res = self.client().post("/venues/search", data={"search_term": "venue 1"})
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"Number of search results for \"venue 1\": 3", res.data)
+
+    def test_search_artists_escapes_wildcards(self):
+        self.seed(venues=1, shows_per_venue=1)
+
+        res = self.client().post("/artists/search", data={"search_term": "%"})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn(b"The Wild Sax Band", res.data)
+
+        res = self.client().post("/artists/search", data={"search_term": "SAX"})
+        self.assertIn(b"The Wild Sax Band", res.data)
+
+    def test_create_show_stores_timestamp(self):
+        self.seed(venues=1, shows_per_venue=0)
+
+        res = self.client().post("/shows/create", data={
+            "venue_id": 1, "artist_id": 1, "start_time": "2035-04-01 20:00:00"})
+        self.assertEqual(res.status_code, 200)
+
+        show = Show.query.one()
+        self.assertEqual(show.start_time.isoformat(), "2035-04-01T20:00:00+00:00")
+        res = self.client().get("/artists/1")
+        self.assertIn(b"1 Upcoming Show", res.data)
+
+    def test_show_page_walks_every_show_once(self):
+        self.seed(venues=7, shows_per_venue=3)
+
+        seen = []
+        after = None
+        while True:
+            with self.assertMaxQueries(1):
+                data, after = show_page(after, limit=4)
+            seen.extend(data)
+            if after is None:
+                break
+        self.assertEqual(len(seen), 21)
+        self.assertEqual(len(set((show["venue_id"], show["start_time"]) for show in seen)), 7)
+
+    def test_listing_pages_link_to_next_cursor(self):
+        self.seed(venues=5, shows_per_venue=1)
+
+        res = self.client().get("/venues?limit=2")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"Next page", res.data)
+        self.assertEqual(res.data.count(b'<i class="fas fa-music">'), 2)
+
+        res = self.client().get("/shows?limit=5")
+        self.assertNotIn(b"Next page", res.data)
+
+        res = self.client().get("/artists?after=not-a-cursor")
+        self.assertEqual(res.status_code, 400)
+
+    def test_400_cursor_with_mistyped_values(self):
+        self.seed(venues=3, shows_per_venue=1)
+
+        for values in (["CA", "City1", "x"], {"state": "CA"}, ["CA", 1, 2], [1], ["not a date", 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            for path in ("/venues", "/shows"):
+                res = self.client().get("%s?after=%s" % (path, cursor))
+                self.assertEqual(res.status_code, 400, (path, values))
+
+    def test_detail_pages_are_cached_until_a_show_is_added(self):
+        self.seed(venues=2, shows_per_venue=1)
+        self.client().get("/venues/1")
+        self.client().get("/artists/1")
+
+        with self.assertMaxQueries(0):
+            self.client().get("/venues/1")
+            self.client().get("/artists/1")
+
+        self.client().post("/shows/create", data={
+            "venue_id": 1, "artist_id": 1, "start_time": "2035-04-01 20:00:00"})
+        self.assertIn(b"2 Upcoming Shows", self.client().get("/venues/1").data)
+        self.assertIn(b"3 Upcoming Shows", self.client().get("/artists/1").data)
+
+    def test_detail_pages_answer_conditional_requests_with_304(self):
+        self.seed(venues=2, shows_per_venue=3)
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime(2000, 1, 1, 20)))
+        db.session.commit()
+        res = self.client().get("/venues/1")
+        etag = res.headers["ETag"]
+        self.assertIn("Last-Modified", res.headers)
+
+        with self.assertMaxQueries(0):
+            res = self.client().get("/venues/1", headers={"If-None-Match": etag})
+        self.assertEqual((res.status_code, res.data), (304, b""))
+
+        cache.clear()
+        with self.assertMaxQueries(1):
+            res = self.client().get("/venues/1", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(self.client().get("/artists/42", headers={"If-None-Match": etag}).status_code, 404)
+
+        self.client().post("/artists/1/edit", data={"name": "The Wild Sax Quartet"})
+        res = self.client().get("/venues/1", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"The Wild Sax Quartet", res.data)
+        self.assertNotEqual(res.headers["ETag"], etag)
+
+    def test_editing_a_venue_invalidates_its_artists(self):
+        self.seed(venues=1, shows_per_venue=1)
+        self.client().get("/artists/1")
+
+        self.client().post("/venues/1/edit", data={
+            "name": "The Dueling Pianos Bar", "genres": ["Jazz"], "address": "1 Main St",
+            "city": "City 0", "state": "CA", "phone": "123-123-1234", "facebook_link": ""})
+        self.assertIn(b"The Dueling Pianos Bar", self.client().get("/artists/1").data)
+
+    def test_upcoming_counters_follow_inserts_deletes_and_rollover(self):
+        self.seed(venues=2, shows_per_venue=2)
+        self.client().post("/shows/create", data={
+            "venue_id": 1, "artist_id": 1, "start_time": "2035-04-01 20:00:00"})
+        self.assertEqual([venue.upcoming_shows_count for venue in Venue.query.order_by(Venue.id)], [3, 2])
+        self.assertEqual(Artist.query.get(1).upcoming_shows_count, 5)
+
+        self.client().delete("/venues/2")
+        self.assertEqual(Artist.query.get(1).upcoming_shows_count, 3)
+
+        venue_ids, artist_ids = roll_over_upcoming_counts(now=datetime(2036, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual((venue_ids, artist_ids), ({1}, {1}))
+        self.assertEqual(Venue.query.get(1).upcoming_shows_count, 2)
+        self.assertEqual(Artist.query.get(1).upcoming_shows_count, 2)
+        self.assertEqual(Show.query.filter_by(is_upcoming=True).count(), 2)
+
+        Venue.query.update({Venue.upcoming_shows_count: 0})
+        db.session.commit()
+        self.assertEqual(app.test_cli_runner().invoke(args=["counters", "rebuild"]).exit_code, 0)
+        self.assertEqual(Venue.query.get(1).upcoming_shows_count, 3)
+
+    def test_bulk_delete_removes_venues_and_their_shows_in_chunks(self):
+        self.seed(venues=5, shows_per_venue=2)
+        app.config["DELETE_CHUNK_SIZE"] = 2
+        self.addCleanup(app.config.__setitem__, "DELETE_CHUNK_SIZE", 500)
+
+        with self.count_queries() as statements:
+            res = self.client().delete("/venues", json={"ids": [1, 2, 3, 5, 42]})
+        self.assertEqual(res.get_json(), {"deleted": 4})
+        self.assertEqual(len([statement for statement in statements if statement.startswith("DELETE FROM venue ")]), 3)
+        self.assertEqual([venue.id for venue in Venue.query.all()], [4])
+        self.assertEqual(Show.query.count(), 2)
+        self.assertEqual(Artist.query.get(1).upcoming_shows_count, 2)
+        self.assertEqual(self.client().get("/shows").status_code, 200)
+
+        self.assertEqual(self.client().delete("/venues?id=x").status_code, 400)
+
+    def test_edit_writes_only_changed_columns_in_one_update(self):
+        self.seed(venues=1, shows_per_venue=0)
+        form = self.client().get("/venues/1/edit").data.decode()
+        snapshot = re.search(r'id="snapshot" name="snapshot" type="hidden" value="([^"]*)"', form).group(1)
+        data = dict(json.loads(html.unescape(snapshot)), version="1", snapshot=html.unescape(snapshot))
+        data["phone"] = "555-555-5555"
+
+        with self.count_queries() as statements:
+            self.client().post("/venues/1/edit", data=data)
+        updates = [statement for statement in statements if statement.startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("SET phone=?, version=(venue.version + ?), updated_at=? WHERE venue.id = ? AND venue.version = ?",
+                      updates[0])
+        self.assertEqual((Venue.query.get(1).phone, Venue.query.get(1).version), ("555-555-5555", 2))
+
+        data["phone"] = "666-666-6666"
+        res = self.client().post("/venues/1/edit", data=data)
+        self.assertTrue(res.headers["Location"].endswith("/venues/1/edit"))
+        self.assertEqual(Venue.query.get(1).phone, "555-555-5555")
+
+        del data["version"]
+        with self.assertMaxQueries(1):
+            res = self.client().post("/venues/42/edit", data=data)
+        self.assertEqual(res.status_code, 404)
+
+    def test_edit_links_genres_that_do_not_exist_yet(self):
+        self.seed(venues=1, shows_per_venue=0)
+        self.client().post("/venues/1/edit", data={
+            "name": "Venue 1", "genres": ["Jazz", "Brand New Genre"], "address": "1 Main St",
+            "city": "City 0", "state": "CA", "phone": "123-123-1234", "facebook_link": ""})
+
+        self.assertEqual(sorted(genre.name for genre in Venue.query.get(1).genres), ["Brand New Genre", "Jazz"])
+
+    def test_edit_without_genres_field_keeps_genres(self):
+        self.seed(venues=1, shows_per_venue=0)
+
+        self.client().post("/artists/1/edit", data={"name": "The Wilder Sax Band"})
+        self.assertEqual([genre.name for genre in Artist.query.get(1).genres], ["Jazz"])
+
+        self.client().post("/artists/1/edit", data={"name": "The Wilder Sax Band", "snapshot": "{}"})
+        self.assertEqual(Artist.query.get(1).genres, [])
+
+    def test_fragment_cache_renders_once_until_its_page_key_is_deleted(self):
+        template = app.jinja_env.from_string(
+            "{% cache ('shows', page), 60 %}<b>{{ name }}</b>{% endcache %}")
+        self.assertEqual(template.render(page=1, name="Jazz"), "<b>Jazz</b>")
+        self.assertEqual(template.render(page=1, name="<Swing>"), "<b>Jazz</b>")
+        self.assertEqual(template.render(page=2, name="<Swing>"), "<b>&lt;Swing&gt;</b>")
+
+        cache.delete("shows")
+        self.assertEqual(template.render(page=1, name="Folk"), "<b>Folk</b>")
+
+    def test_fragment_invalidation_survives_lru_eviction(self):
+        backend = LRUCache(max_entries=4)
+        self.addCleanup(setattr, cache, "backend", cache.backend)
+        cache.backend = backend
+        template = app.jinja_env.from_string("{% cache 'venue:1' %}<b>{{ name }}</b>{% endcache %}")
+        self.assertEqual(template.render(name="Jazz"), "<b>Jazz</b>")
+        # Fragment hits keep the fragment alive while other entries churn.
+        cache.set("a", "a")
+        self.assertEqual(template.render(name="Folk"), "<b>Jazz</b>")
+        cache.set("b", "b")
+        cache.set("c", "c")
+        self.assertEqual(template.render(name="Folk"), "<b>Jazz</b>")
+
+        cache.delete("venue:1")
+        self.assertEqual(template.render(name="Folk"), "<b>Folk</b>")
+
+    def test_show_fragments_are_invalidated_with_their_pages(self):
+        self.seed(venues=1, shows_per_venue=1)
+        self.client().get("/shows")
+        self.client().get("/venues/1")
+
+        self.client().post("/artists/1/edit", data={"name": "The Wild Sax Quartet"})
+        self.assertIn(b"The Wild Sax Quartet", self.client().get("/shows").data)
+        self.assertIn(b"The Wild Sax Quartet", self.client().get("/venues/1").data)
+
+    def test_format_datetime_accepts_strings_datetimes_and_locales(self):
+        start_time = datetime(2035, 4, 1, 20)
+        self.assertEqual(format_datetime(start_time, "full"), "Sunday April, 1, 2035 at 8:00PM")
+        self.assertEqual(format_datetime("2035-04-01T20:00:00Z", "full"), "Sunday April, 1, 2035 at 8:00PM")
+        self.assertEqual(format_datetime(start_time, "full", "de_DE"), "Sonntag April, 1, 2035 at 8:00PM")
+
+    def test_listings_filter_by_genre(self):
+        self.seed(venues=3, shows_per_venue=1)
+        self.client().post("/venues/create", data={
+            "name": "The Musical Hop", "genres": ["Swing", "Folk"], "address": "1015 Folsom Street",
+            "city": "San Francisco", "state": "CA", "phone": "123-123-1234", "facebook_link": ""})
+
+        res = self.client().get("/venues?genre=Swing")
+        self.assertIn(b"The Musical Hop", res.data)
+        self.assertNotIn(b"Venue 0", res.data)
+        self.assertIn(b"Folk", self.client().get("/venues/4").data)
+
+        res = self.client().get("/artists?genre=Jazz")
+        self.assertIn(b"The Wild Sax Band", res.data)
+        res = self.client().get("/artists?genre=Swing")
+        self.assertNotIn(b"The Wild Sax Band", res.data)
+
+    def test_data_import_and_export_round_trip(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        venues = os.path.join(directory, "venues.csv")
+        shows = os.path.join(directory, "shows.ndjson")
+        with open(venues, "w") as file:
+            file.write('id,name,genres,address,city,state,phone,seeking_talent\n'
+                       '7,The Musical Hop,"[""Jazz"", ""Swing""]",1015 Folsom Street,San Francisco,CA,123-123-1234,true\n')
+        with open(shows, "w") as file:
+            file.write(json.dumps({"venue_id": 7, "artist_id": 1, "start_time": "2035-04-01T20:00:00Z"}) + "\n")
+        self.seed(venues=0, shows_per_venue=0)
+
+        runner = app.test_cli_runner()
+        self.assertEqual(runner.invoke(args=["data", "import", "venues", venues]).exit_code, 0)
+        self.assertEqual(runner.invoke(args=["data", "import", "shows", shows, "--batch-size", "1"]).exit_code, 0)
+        res = self.client().get("/venues/7")
+        self.assertIn(b"Swing", res.data)
+        self.assertIn(b"1 Upcoming Show", res.data)
+
+        export = os.path.join(directory, "venues.ndjson")
+        self.assertEqual(runner.invoke(args=["data", "export", "venues", export]).exit_code, 0)
+        with open(export) as file:
+            exported = [json.loads(line) for line in file]
+        self.assertEqual(exported[0]["genres"], ["Jazz", "Swing"])
+        self.assertTrue(exported[0]["seeking_talent"])
+
+    def test_sql_instrumentation_reports_server_timing(self):
+        self.seed(venues=1, shows_per_venue=1)
+        app.config["SQL_INSTRUMENTATION"] = True
+        self.addCleanup(app.config.__setitem__, "SQL_INSTRUMENTATION", False)
+
+        with self.assertLogs(app.logger, "INFO") as logs:
+            res = self.client().get("/venues/1")
+        self.assertRegex(res.headers["Server-Timing"], r'db;dur=[0-9.]+;desc="2 queries"')
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line["endpoint"], line["queries"], line["n_plus_one"]), ("show_venue", 2, []))
+
+    def test_sql_instrumentation_flags_n_plus_one(self):
+        self.seed(venues=8, shows_per_venue=0)
+        app.config["SQL_INSTRUMENTATION"] = True
+        self.addCleanup(app.config.__setitem__, "SQL_INSTRUMENTATION", False)
+        instrumentation = app.extensions["sql_instrumentation"]
+
+        with app.test_request_context("/venues"), self.assertLogs(app.logger, "WARNING") as logs:
+            instrumentation.before_request()
+            for venue_id in range(1, 9):
+                db.session.execute(db.select([Venue.name]).where(Venue.id == venue_id))
+            instrumentation.after_request(app.response_class())
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line["n_plus_one"][0]["count"], 8)
+
+    def test_sql_instrumentation_survives_failing_statements(self):
+        self.seed(venues=1, shows_per_venue=0)
+        app.config["SQL_INSTRUMENTATION"] = True
+        self.addCleanup(app.config.__setitem__, "SQL_INSTRUMENTATION", False)
+        instrumentation = app.extensions["sql_instrumentation"]
+
+        with app.test_request_context("/venues"):
+            instrumentation.before_request()
+            connection = db.session.connection()
+            with self.assertRaises(Exception):
+                connection.exec_driver_sql("SELECT * FROM no_such_table")
+            db.session.rollback()
+            connection = db.session.connection()
+            connection.exec_driver_sql("SELECT 1")
+            stats = instrumentation.current()
+            self.assertEqual(stats.queries, 1)
+            self.assertEqual(connection.info.get("sql_started", []), [])
+
+    def test_asgi_serves_read_routes_through_the_async_engine(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(app.config.__setitem__, "SQLALCHEMY_DATABASE_URI", "sqlite://")
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(directory, "asgi.db")
+        db.create_all()
+        self.seed(venues=3, shows_per_venue=2)
+        application = AsyncApp(app)
+
+        async def get(path):
+            messages = []
+            scope = {"type": "http", "http_version": "1.1", "method": "GET", "path": path,
+                     "root_path": "", "scheme": "http", "query_string": b"",
+                     "headers": [(b"host", b"localhost")], "server": ("localhost", 80)}
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                messages.append(message)
+
+            await application(scope, receive, send)
+            return messages[0]["status"], b"".join(message.get("body", b"") for message in messages[1:])
+
+        async def run():
+            try:
+                return await asyncio.gather(*[get(path) for path in
+                                              ["/venues", "/venues/1", "/artists/1", "/shows", "/venues/42"] * 4])
+            finally:
+                await application.engine.dispose()
+
+        with self.count_queries() as sync_statements:
+            responses = asyncio.run(run())
+        self.assertEqual([status for status, _ in responses[:5]], [200, 200, 200, 200, 404])
+        self.assertIn(b"2 Upcoming Shows", responses[1][1])
+        self.assertIn(b"6 Upcoming Shows", responses[2][1])
+        self.assertEqual(sync_statements, [])
+
+    def test_built_assets_are_fingerprinted_compressed_and_cached_forever(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        os.makedirs(os.path.join(directory, "css"))
+        os.makedirs(os.path.join(directory, "fonts"))
+        with open(os.path.join(directory, "css", "main.css"), "w") as file:
+            file.write("@font-face { src: url('../fonts/icons.ttf?v=1'); }\n" * 20)
+        with open(os.path.join(directory, "fonts", "icons.ttf"), "w") as file:
+            file.write("glyphs")
+
+        static_folder = app.static_folder
+        self.addCleanup(static_assets.load)
+        self.addCleanup(setattr, app, "static_folder", static_folder)
+        app.static_folder = directory
+        manifest = static_assets.build()
+        with open(os.path.join(directory, "dist", manifest["css/main.css"])) as file:
+            self.assertIn("url('../%s?v=1')" % manifest["fonts/icons.ttf"], file.read())
+
+        with app.test_request_context():
+            url = render_template_string("{{ asset_url('css/main.css') }}")
+        self.assertRegex(url, r"^/static/dist/css/main\.[0-9a-f]{12}\.css$")
+        res = self.client().get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(res.headers["Content-Encoding"], "gzip")
+        self.assertEqual(res.headers["Content-Type"], "text/css; charset=utf-8")
+        self.assertIn("immutable", res.headers["Cache-Control"])
+        self.assertIn(b"@font-face", gzip.decompress(res.data))
+        res.close()
+
+    def test_warmup_compiles_every_template(self):
+        app.jinja_env.cache.clear()
+        result = app.test_cli_runner().invoke(args=["warmup"])
+        self.assertEqual(result.exit_code, 0)
+        for step in ("templates", "babel", "mappers", "database"):
+            self.assertIn(step, result.output)
+        self.assertNotIn("failed", result.output)
+        names = app.jinja_env.list_templates(extensions=["html"])
+        self.assertEqual(len(app.jinja_env.cache), len(names))
+
+    def test_metrics_reports_pool_checkouts_and_wait_time(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        engine = create_engine("sqlite:///" + os.path.join(directory, "pool.db"),
+                               **pool_options({"DB_POOL_SIZE": 2, "DB_MAX_OVERFLOW": 1}))
+        self.assertIsInstance(engine.pool, TimedQueuePool)
+
+        first, second = engine.connect(), engine.connect()
+        status = pool_status(engine)
+        self.assertEqual((status["size"], status["checked_out"], status["checkouts"]), (2, 2, 2))
+        first.close()
+        second.close()
+        status = pool_status(engine)
+        self.assertEqual((status["checked_out"], status["idle"]), (0, 2))
+        self.assertGreaterEqual(status["wait_ms_max"], 0)
+
+        res = self.client().get("/metrics")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()["pool"]["class"], "StaticPool")
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+'''
+Synthetic question bank for the benchmarks.
+'''
+from flask import current_app
+
+from models import db, Question, Category
+
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment', 'Sports']
+
+WORDS = ['river', 'painting', 'planet', 'empire', 'movie', 'league', 'element', 'mountain',
+  'novel', 'war', 'album', 'olympic', 'ocean', 'sculpture', 'king', 'theory', 'desert',
+  'composer', 'island', 'champion', 'treaty', 'galaxy', 'poet', 'volcano']
+
+
+def question_rows(count):
+  for id in range(1, count + 1):
+    words = [WORDS[(id * step) % len(WORDS)] for step in (1, 7, 13)]
+    yield {'question': 'Which %s is linked to the %s and the %s (%d)?' % tuple(words + [id]),
+      'answer': 'The %s %d' % (words[0], id), 'category': str(id % len(CATEGORIES) + 1),
+      'difficulty': id % 5 + 1}
+
+
+def seed(questions, batch_size=10000):
+  '''
+  Recreates the schema with the six categories and `questions` questions
+  spread evenly over them. Must run in an app context. The rows bypass
+  the ORM, so the category catalog loaded by create_app() is dropped.
+  '''
+  db.drop_all()
+  db.create_all()
+  db.session.execute(Category.__table__.insert(), [{'type': type} for type in CATEGORIES])
+  batch = []
+  for row in question_rows(questions):
+    batch.append(row)
+    if len(batch) == batch_size:
+      db.session.execute(Question.__table__.insert(), batch)
+      batch = []
+  if batch:
+    db.session.execute(Question.__table__.insert(), batch)
+  db.session.commit()
+  if 'category_catalog' in current_app.extensions:
+    current_app.extensions['category_catalog'].invalidate()
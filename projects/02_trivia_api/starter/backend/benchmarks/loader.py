@@ -0,0 +1,65 @@
+'''
+Rows per second for bulk question loading: load_file() on an NDJSON
+question pack at a few batch sizes, against Question.insert(), which
+commits per row:
+
+    $ python -m benchmarks.loader --questions 200000
+'''
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from flaskr import create_app
+from models import db, Question
+from loader import load_file
+from benchmarks import dataset
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--questions', type=int, default=200000, help='questions in the pack')
+  parser.add_argument('--batch-sizes', type=int, nargs='*', default=[100, 1000, 10000])
+  parser.add_argument('--per-row', type=int, default=2000, help='questions loaded with Question.insert()')
+  parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+  parser.add_argument('--output', help='write the results as JSON to this file')
+  args = parser.parse_args()
+
+  directory = tempfile.mkdtemp(prefix='trivia-bench-')
+  try:
+    database_url = args.database_url or 'sqlite:///' + os.path.join(directory, 'trivia.db')
+    pack = os.path.join(directory, 'pack.ndjson')
+    with open(pack, 'w') as file:
+      for row in dataset.question_rows(args.questions):
+        file.write(json.dumps(row) + '\n')
+
+    app = create_app({'DATABASE_PATH': database_url})
+    results = {'meta': {'database': database_url.split(':')[0], 'questions': args.questions}}
+    with app.app_context():
+      dataset.seed(0)
+      started = time.perf_counter()
+      for row in dataset.question_rows(args.per_row):
+        Question(**row).insert()
+      results['per_row_insert'] = args.per_row / (time.perf_counter() - started)
+
+      print('%-22s %14s' % ('method', 'rows/s'))
+      print('%-22s %14d' % ('Question.insert()', results['per_row_insert']))
+      results['load_file'] = {}
+      for batch_size in args.batch_sizes:
+        db.session.query(Question).delete()
+        db.session.commit()
+        report = load_file(pack, batch_size=batch_size)
+        results['load_file'][batch_size] = report['rows_per_second']
+        print('%-22s %14d' % ('batches of %d' % batch_size, report['rows_per_second']))
+
+    if args.output:
+      with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,92 @@
+'''
+Cost of /questions at increasing page depths: ?page= (OFFSET) against
+?cursor= (keyset seek on the (category, id) index), next to loading every
+question and slicing in Python, and the cached total against a COUNT(*)
+per request:
+
+    $ python -m benchmarks.pagination --questions 500000
+    $ python -m benchmarks.pagination --database-url postgresql://localhost/trivia_bench
+'''
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import func
+
+from flaskr import create_app, QUESTIONS_PER_PAGE
+from models import db, Question
+from pagination import encode_cursor
+from benchmarks import dataset
+
+
+def timed(function, repeat):
+  '''
+  Median milliseconds of `repeat` calls.
+  '''
+  timings = []
+  for _ in range(repeat):
+    started = time.perf_counter()
+    function()
+    timings.append((time.perf_counter() - started) * 1000)
+  return sorted(timings)[len(timings) // 2]
+
+
+def get(client, path):
+  response = client.get(path)
+  assert response.status_code == 200, (path, response.status_code)
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--questions', type=int, default=500000)
+  parser.add_argument('--depths', type=int, nargs='*', default=[1, 10, 100, 1000, 10000, 49000],
+    help='page numbers to fetch')
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+  parser.add_argument('--output', help='write the results as JSON to this file')
+  args = parser.parse_args()
+
+  directory = tempfile.mkdtemp(prefix='trivia-bench-')
+  try:
+    database_url = args.database_url or 'sqlite:///' + os.path.join(directory, 'trivia.db')
+    app = create_app({'DATABASE_PATH': database_url})
+    client = app.test_client()
+    with app.app_context():
+      dataset.seed(args.questions)
+      pages = (args.questions + QUESTIONS_PER_PAGE - 1) // QUESTIONS_PER_PAGE
+
+      results = {'meta': {'database': database_url.split(':')[0], 'questions': args.questions}}
+      results['load_all_and_slice_ms'] = round(timed(
+        lambda: Question.query.order_by(Question.id).all()[:QUESTIONS_PER_PAGE], 1), 3)
+      results['count_star_ms'] = round(timed(lambda: db.session.query(func.count(Question.id)).scalar(),
+        args.repeat), 3)
+      get(client, '/questions')
+      results['cached_count_ms'] = round(timed(
+        lambda: app.extensions['question_counts'].total(), args.repeat), 3)
+
+      print('%-10s %14s %14s' % ('page', 'offset ms', 'cursor ms'))
+      results['pages'] = {}
+      for depth in [depth for depth in args.depths if 1 < depth <= pages]:
+        last = Question.query.order_by(Question.category, Question.id)\
+          .offset((depth - 1) * QUESTIONS_PER_PAGE - 1).first()
+        cursor = encode_cursor(last)
+        offset_ms = timed(lambda: get(client, '/questions?page=%d' % depth), args.repeat)
+        cursor_ms = timed(lambda: get(client, '/questions?cursor=%s' % cursor), args.repeat)
+        results['pages'][depth] = {'offset_ms': round(offset_ms, 3), 'cursor_ms': round(cursor_ms, 3)}
+        print('%-10d %14.2f %14.2f' % (depth, offset_ms, cursor_ms))
+
+    print('\nload all and slice: %.1f ms, COUNT(*): %.2f ms, cached count: %.4f ms' % (
+      results['load_all_and_slice_ms'], results['count_star_ms'], results['cached_count_ms']))
+
+    if args.output:
+      with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  main()
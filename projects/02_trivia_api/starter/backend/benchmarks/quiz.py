@@ -0,0 +1,71 @@
+'''
+Cost of one /quizzes turn as a quiz goes on: the pool draw plus primary
+key fetch against loading the category's questions, filtering out the
+previous ones and picking with random.choice:
+
+    $ python -m benchmarks.quiz --questions 500000
+'''
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+
+from flaskr import create_app
+from models import Question
+from benchmarks import dataset
+from benchmarks.pagination import timed
+
+
+def naive_turn(category, previous):
+  questions = [question for question in Question.query.filter_by(category=category).all()
+    if question.id not in previous]
+  return random.choice(questions) if questions else None
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--questions', type=int, default=500000)
+  parser.add_argument('--previous', type=int, nargs='*', default=[0, 10, 100, 1000, 10000],
+    help='questions already played')
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+  parser.add_argument('--output', help='write the results as JSON to this file')
+  args = parser.parse_args()
+
+  directory = tempfile.mkdtemp(prefix='trivia-bench-')
+  try:
+    database_url = args.database_url or 'sqlite:///' + os.path.join(directory, 'trivia.db')
+    app = create_app({'DATABASE_PATH': database_url})
+    client = app.test_client()
+    with app.app_context():
+      dataset.seed(args.questions)
+      pool = app.extensions['quiz_pool']
+      load_ms = timed(pool.get, 1)
+      category_ids = [id for id, in Question.query.with_entities(Question.id).filter_by(category='1')]
+
+    results = {'meta': {'database': database_url.split(':')[0], 'questions': args.questions},
+      'pool_load_ms': round(load_ms, 3), 'turns': {}}
+    print('%-10s %14s %14s %14s' % ('previous', 'naive ms', 'pool ms', 'endpoint ms'))
+    for count in args.previous:
+      previous = category_ids[:count]
+      with app.app_context():
+        naive_ms = timed(lambda: naive_turn('1', set(previous)), args.repeat)
+        pool_ms = timed(lambda: pool.next_question('1', previous), args.repeat)
+      body = {'previous_questions': previous, 'quiz_category': {'type': 'Science', 'id': 1}}
+      endpoint_ms = timed(lambda: client.post('/quizzes', json=body), args.repeat)
+      results['turns'][count] = {'naive_ms': round(naive_ms, 3), 'pool_ms': round(pool_ms, 3),
+        'endpoint_ms': round(endpoint_ms, 3)}
+      print('%-10d %14.2f %14.3f %14.3f' % (count, naive_ms, pool_ms, endpoint_ms))
+    print('\npool load (once per QUIZ_POOL_TTL): %.1f ms' % load_ms)
+
+    if args.output:
+      with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,67 @@
+'''
+Question search on a large corpus: QuestionSearch (the full-text and
+trigram indexes on Postgres, the in-memory inverted index elsewhere)
+against the sequential ILIKE '%term%' scan it replaces:
+
+    $ python -m benchmarks.search --questions 500000
+    $ python -m benchmarks.search --database-url postgresql://localhost/trivia_bench
+'''
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+from flaskr import create_app, QUESTIONS_PER_PAGE
+from models import Question
+from benchmarks import dataset
+from benchmarks.pagination import timed
+
+TERMS = ['galaxy', 'volcano poet', 'champ', 'which treaty', 'unmatched']
+
+
+def ilike_search(term):
+  matches = Question.query.filter(Question.question.ilike('%' + term + '%'))
+  return matches.order_by(Question.id).limit(QUESTIONS_PER_PAGE).all(), matches.count()
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument('--questions', type=int, default=500000)
+  parser.add_argument('--terms', nargs='*', default=TERMS)
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+  parser.add_argument('--output', help='write the results as JSON to this file')
+  args = parser.parse_args()
+
+  directory = tempfile.mkdtemp(prefix='trivia-bench-')
+  try:
+    database_url = args.database_url or 'sqlite:///' + os.path.join(directory, 'trivia.db')
+    app = create_app({'DATABASE_PATH': database_url})
+    with app.app_context():
+      dataset.seed(args.questions)
+      search = app.extensions['question_search']
+      # The first search loads the in-memory index; Postgres has nothing to load.
+      first_ms = timed(lambda: search.search('warmup', QUESTIONS_PER_PAGE), 1)
+
+      results = {'meta': {'database': database_url.split(':')[0], 'questions': args.questions},
+        'first_search_ms': round(first_ms, 3), 'terms': {}}
+      print('%-16s %10s %14s %14s' % ('term', 'matches', 'ILIKE ms', 'search ms'))
+      for term in args.terms:
+        ilike_ms = timed(lambda: ilike_search(term), args.repeat)
+        search_ms = timed(lambda: search.search(term, QUESTIONS_PER_PAGE), args.repeat)
+        matches = search.search(term, QUESTIONS_PER_PAGE)[1]
+        results['terms'][term] = {'matches': matches, 'ilike_ms': round(ilike_ms, 3),
+          'search_ms': round(search_ms, 3)}
+        print('%-16s %10d %14.2f %14.2f' % (term, matches, ilike_ms, search_ms))
+    print('\nfirst search (index load): %.1f ms' % first_ms)
+
+    if args.output:
+      with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+  finally:
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,40 @@
+import json
+
+from models import db, Category
+from reloading import Reloading
+
+'''
+CategoryCatalog
+    the {id: type} map of every category, loaded when the app is created
+    and kept with its JSON encoding so responses can embed it as is.
+    Categories rarely change: commits that write them drop the catalog,
+    and CATEGORY_CATALOG_TTL catches the ones made elsewhere.
+'''
+class CategoryCatalog(Reloading):
+
+  def __init__(self, app=None):
+    Reloading.__init__(self)
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('CATEGORY_CATALOG_TTL', 300)
+    self.ttl = app.config['CATEGORY_CATALOG_TTL']
+    app.extensions['category_catalog'] = self
+    app.extensions.setdefault('category_listeners', []).append(self.invalidate)
+    with app.app_context():
+      self.get()
+
+  def load(self):
+    '''
+    (categories, encoded): the {str(id): type} map and its JSON text.
+    '''
+    categories = dict((str(id), type) for id, type in
+      db.session.query(Category.id, Category.type).order_by(Category.id))
+    return categories, json.dumps(categories)
+
+  def type(self, category_id):
+    '''
+    The type of the category with this id (int or str), or None.
+    '''
+    return self.get()[0].get(str(category_id))
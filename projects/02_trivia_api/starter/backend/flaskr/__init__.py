@@ -1,104 +1,159 @@
 import os
-from flask import Flask, request, abort, jsonify
+import json
+from flask import Flask, Response, request, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import random
 
 from models import setup_db, Question, Category
+from catalog import CategoryCatalog
+from loader import load_questions_command
+from pagination import QuestionCounts, paginate_questions
+from quiz import QuizPool
+from search import QuestionSearch
 
 QUESTIONS_PER_PAGE = 10
 
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
-  setup_db(app)
-  
-  '''
-  @TODO: Set up CORS. Allow '*' for origins. Delete the sample route after completing the TODOs
-  '''
-
-  '''
-  @TODO: Use the after_request decorator to set Access-Control-Allow
-  '''
-
-  '''
-  @TODO: 
-  Create an endpoint to handle GET requests 
-  for all available categories.
-  '''
-
-
-  '''
-  @TODO: 
-  Create an endpoint to handle GET requests for questions, 
-  including pagination (every 10 questions). 
-  This endpoint should return a list of questions, 
-  number of total questions, current category, categories. 
-
-  TEST: At this point, when you start the application
-  you should see questions and categories generated,
-  ten questions per page and pagination at the bottom of the screen for three pages.
-  Clicking on the page numbers should update the questions. 
-  '''
-
-  '''
-  @TODO: 
-  Create an endpoint to DELETE question using a question ID. 
-
-  TEST: When you click the trash icon next to a question, the question will be removed.
-  This removal will persist in the database and when you refresh the page. 
-  '''
-
-  '''
-  @TODO: 
-  Create an endpoint to POST a new question, 
-  which will require the question and answer text, 
-  category, and difficulty score.
-
-  TEST: When you submit a question on the "Add" tab, 
-  the form will clear and the question will appear at the end of the last page
-  of the questions list in the "List" tab.  
-  '''
-
-  '''
-  @TODO: 
-  Create a POST endpoint to get questions based on a search term. 
-  It should return any questions for whom the search term 
-  is a substring of the question. 
-
-  TEST: Search by any phrase. The questions list will update to include 
-  only question that include that string within their question. 
-  Try using the word "title" to start. 
-  '''
-
-  '''
-  @TODO: 
-  Create a GET endpoint to get questions based on category. 
-
-  TEST: In the "List" tab / main screen, clicking on one of the 
-  categories in the left column will cause only questions of that 
-  category to be shown. 
-  '''
-
-
-  '''
-  @TODO: 
-  Create a POST endpoint to get questions to play the quiz. 
-  This endpoint should take category and previous question parameters 
-  and return a random questions within the given category, 
-  if provided, and that is not one of the previous questions. 
-
-  TEST: In the "Play" tab, after a user selects "All" or a category,
-  one question at a time is displayed, the user is allowed to answer
-  and shown whether they were correct or not. 
-  '''
-
-  '''
-  @TODO: 
-  Create error handlers for all expected errors 
-  including 404 and 422. 
-  '''
-  
+  if test_config is None:
+    setup_db(app)
+  else:
+    setup_db(app, test_config['DATABASE_PATH'])
+    app.config.update(test_config)
+  category_catalog = CategoryCatalog(app)
+  question_counts = QuestionCounts(app)
+  quiz_pool = QuizPool(app)
+  question_search = QuestionSearch(app)
+
+  app.cli.add_command(load_questions_command)
+
+  CORS(app, resources={r'/*': {'origins': '*'}})
+
+  @app.after_request
+  def after_request(response):
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,true')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return response
+
+  def with_categories(data):
+    '''
+    A JSON response of `data` plus a categories field holding the
+    catalog's pre-encoded {id: type} map.
+    '''
+    body = json.dumps(data)
+    return Response('{"categories": %s, %s' % (category_catalog.get()[1], body[1:]),
+      mimetype='application/json')
+
+  def question_page(category=None):
+    '''
+    The page of questions selected by ?cursor= (the next_cursor of the
+    previous page) or, failing that, ?page=.
+    '''
+    cursor = request.args.get('cursor')
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+      abort(400)
+    try:
+      questions, next_cursor = paginate_questions(QUESTIONS_PER_PAGE, category, cursor, page)
+    except ValueError:
+      abort(400)
+    if not questions and (cursor or page > 1):
+      abort(404)
+    return {
+      'questions': [question.format() for question in questions],
+      'total_questions': question_counts.total(category),
+      'next_cursor': next_cursor
+    }
+
+  @app.route('/categories')
+  def get_categories():
+    return with_categories({'success': True})
+
+  @app.route('/questions')
+  def get_questions():
+    return with_categories(dict(question_page(), success=True, current_category=None))
+
+  @app.route('/questions/<int:question_id>', methods=['DELETE'])
+  def delete_question(question_id):
+    question = Question.query.get_or_404(question_id)
+    question.delete()
+    return jsonify({'success': True, 'deleted': question_id})
+
+  @app.route('/questions', methods=['POST'])
+  def create_question():
+    body = request.get_json(silent=True) or {}
+    if 'searchTerm' in body:
+      return search_questions(body)
+    question, answer = body.get('question'), body.get('answer')
+    try:
+      difficulty = int(body.get('difficulty'))
+      category = str(int(body.get('category')))
+    except (TypeError, ValueError):
+      abort(422)
+    if not question or not answer or category_catalog.type(category) is None:
+      abort(422)
+    question = Question(question, answer, category, difficulty)
+    question.insert()
+    return jsonify({'success': True, 'created': question.id})
+
+  def search_questions(body):
+    '''
+    One page (`page` in the body, from 1) of the questions whose question
+    or answer matches searchTerm, best matches first.
+    '''
+    term = body.get('searchTerm')
+    page = body.get('page', 1)
+    if not isinstance(term, str) or not isinstance(page, int) or page < 1:
+      abort(400)
+    questions, total = question_search.search(term, QUESTIONS_PER_PAGE, page)
+    return jsonify({
+      'success': True,
+      'questions': [question.format() for question in questions],
+      'total_questions': total,
+      'current_category': None
+    })
+
+  @app.route('/categories/<int:category_id>/questions')
+  def get_category_questions(category_id):
+    category = category_catalog.type(category_id)
+    if category is None:
+      abort(404)
+    return jsonify(dict(question_page(str(category_id)), success=True, current_category=category))
+
+  @app.route('/quizzes', methods=['POST'])
+  def play_quiz():
+    '''
+    A random question of quiz_category (id 0 for all categories) that is
+    not in previous_questions, or null when they have all been played.
+    '''
+    body = request.get_json(silent=True) or {}
+    try:
+      previous = set(int(id) for id in body.get('previous_questions') or ())
+      category_id = int((body.get('quiz_category') or {}).get('id') or 0)
+    except (AttributeError, TypeError, ValueError):
+      abort(400)
+    if category_id and category_catalog.type(category_id) is None:
+      abort(404)
+    question = quiz_pool.next_question(str(category_id) if category_id else None, previous)
+    return jsonify({'success': True, 'question': question.format() if question else None})
+
+  def error(status, message):
+    return jsonify({'success': False, 'error': status, 'message': message}), status
+
+  @app.errorhandler(400)
+  def bad_request(e):
+    return error(400, 'bad request')
+
+  @app.errorhandler(404)
+  def not_found(e):
+    return error(404, 'resource not found')
+
+  @app.errorhandler(422)
+  def unprocessable(e):
+    return error(422, 'unprocessable')
+
   return app
 
     
\ No newline at end of file
@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+import os
+import re
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from models import db, Question, Category, notify_question_listeners
+
+FIELDS = ('question', 'answer', 'category', 'difficulty')
+# Rejected records reported by line number; the rest are only counted.
+MAX_ERRORS = 100
+
+# file extension -> format
+FORMATS = {
+  '.ndjson': 'ndjson',
+  '.jsonl': 'ndjson',
+  '.csv': 'csv',
+  '.psql': 'psql',
+  '.sql': 'psql'
+}
+
+COPY_QUESTIONS = re.compile(r'^COPY (?:public\.)?questions \(([^)]*)\) FROM stdin;$')
+COPY_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v', '\\': '\\'}
+
+'''
+read_ndjson(file) / read_csv(file) / read_psql(file)
+    (line number, record) for every question of an open text file: one
+    JSON object per line, a CSV file with a header row, or the COPY block
+    of the questions table in a pg_dump such as trivia.psql
+'''
+def read_ndjson(file):
+  for number, line in enumerate(file, 1):
+    if line.strip():
+      try:
+        yield number, json.loads(line)
+      except ValueError as error:
+        yield number, error
+
+def read_csv(file):
+  for number, record in enumerate(csv.DictReader(file), 2):
+    yield number, record
+
+def unescape_copy(value):
+  if value == '\\N':
+    return None
+  return re.sub(r'\\(.)', lambda match: COPY_ESCAPES.get(match.group(1), match.group(1)), value)
+
+def read_psql(file):
+  columns = None
+  for number, line in enumerate(file, 1):
+    line = line.rstrip('\n')
+    if columns is None:
+      match = COPY_QUESTIONS.match(line)
+      if match:
+        columns = [column.strip() for column in match.group(1).split(',')]
+    elif line == '\\.':
+      return
+    else:
+      yield number, dict(zip(columns, (unescape_copy(value) for value in line.split('\t'))))
+
+READERS = {'ndjson': read_ndjson, 'csv': read_csv, 'psql': read_psql}
+
+'''
+known_categories()
+    {id or type: id} for every category, from the app's category catalog
+    when it has one
+'''
+def known_categories():
+  catalog = current_app.extensions.get('category_catalog')
+  if catalog is not None:
+    categories = catalog.get()[0]
+  else:
+    categories = dict((str(id), type) for id, type in db.session.query(Category.id, Category.type))
+  known = dict((type, id) for id, type in categories.items())
+  known.update((id, id) for id in categories)
+  return known
+
+'''
+prepare(record, categories)
+    the questions row for a record, raising ValueError when it is not a
+    JSON object, lacks question or answer text, names a category not
+    in `categories` (by id or type), or has a non-integer difficulty.
+    Ids in the record are dropped; loaded questions get new ones.
+'''
+def prepare(record, categories):
+  if isinstance(record, ValueError):
+    raise ValueError('invalid JSON: %s' % record)
+  if not isinstance(record, dict):
+    raise ValueError('not an object')
+  question, answer = record.get('question'), record.get('answer')
+  if not question or not answer or not isinstance(question, str) or not isinstance(answer, str):
+    raise ValueError('question and answer text are required')
+  category = categories.get(str(record.get('category')))
+  if category is None:
+    raise ValueError('unknown category %r' % record.get('category'))
+  try:
+    difficulty = int(record.get('difficulty'))
+  except (TypeError, ValueError):
+    raise ValueError('difficulty %r is not an integer' % record.get('difficulty'))
+  return {'question': question, 'answer': answer, 'category': category, 'difficulty': difficulty}
+
+def copy_value(value):
+  if value is None:
+    return '\\N'
+  return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+'''
+insert_batch(rows)
+    inserts and commits one batch of rows: COPY on Postgres, one
+    executemany INSERT elsewhere
+'''
+def insert_batch(rows):
+  if db.engine.dialect.name == 'postgresql':
+    buffer = io.StringIO(''.join('\t'.join(copy_value(row[field]) for field in FIELDS) + '\n' for row in rows))
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert('COPY questions (%s) FROM STDIN' % ', '.join(FIELDS), buffer)
+    cursor.close()
+  else:
+    db.session.execute(Question.__table__.insert(), rows)
+  db.session.commit()
+
+'''
+load_questions(records, batch_size=1000)
+    streams (line number, record) pairs into the questions table in
+    batches of `batch_size`, committing once per batch. Invalid records
+    are skipped and reported. The questions loaded are passed on to the
+    app's question listeners, as bulk inserts bypass the ORM events. The
+    returned report has loaded, rejected, errors (line number, message)
+    for the first MAX_ERRORS rejected records, seconds and
+    rows_per_second.
+'''
+def load_questions(records, batch_size=1000):
+  started = time.perf_counter()
+  categories = known_categories()
+  last_id = db.session.query(func.max(Question.id)).scalar() or 0
+  report = {'loaded': 0, 'rejected': 0, 'errors': []}
+  batch = []
+  try:
+    for number, record in records:
+      try:
+        batch.append(prepare(record, categories))
+      except ValueError as error:
+        report['rejected'] += 1
+        if len(report['errors']) < MAX_ERRORS:
+          report['errors'].append((number, str(error)))
+        continue
+      if len(batch) == batch_size:
+        insert_batch(batch)
+        report['loaded'] += len(batch)
+        batch = []
+    if batch:
+      insert_batch(batch)
+      report['loaded'] += len(batch)
+  finally:
+    db.session.rollback()
+    if report['loaded']:
+      loaded = db.session.query(Question.id, Question.category).filter(Question.id > last_id).all()
+      notify_question_listeners(loaded, [])
+  report['seconds'] = time.perf_counter() - started
+  report['rows_per_second'] = report['loaded'] / report['seconds'] if report['seconds'] else 0.0
+  return report
+
+'''
+load_file(path, format=None, batch_size=1000)
+    load_questions() over a file, its format taken from the extension
+    (.ndjson/.jsonl, .csv, .psql/.sql) unless given
+'''
+def load_file(path, format=None, batch_size=1000):
+  format = format or FORMATS.get(os.path.splitext(path)[1].lower())
+  if format not in READERS:
+    raise ValueError('Cannot tell the format of %s, pass one of %s' % (path, ', '.join(sorted(READERS))))
+  with open(path, newline='' if format == 'csv' else None, encoding='utf8') as file:
+    return load_questions(READERS[format](file), batch_size)
+
+
+@click.command('load-questions')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(sorted(READERS)), help='defaults to the file extension')
+@click.option('--batch-size', default=1000, show_default=True, help='rows per commit')
+@with_appcontext
+def load_questions_command(paths, format, batch_size):
+  '''Load question packs from NDJSON, CSV or pg_dump files.'''
+  for path in paths:
+    try:
+      report = load_file(path, format, batch_size)
+    except ValueError as error:
+      raise click.UsageError(str(error))
+    click.echo('%s: %d questions in %.2f s (%d rows/s), %d rejected' % (path, report['loaded'],
+      report['seconds'], report['rows_per_second'], report['rejected']))
+    for number, message in report['errors'][:10]:
+      click.echo('  line %d: %s' % (number, message), err=True)
+    if report['rejected'] > 10:
+      click.echo('  ... and %d more' % (report['rejected'] - 10), err=True)
@@ -0,0 +1,11 @@
+-- Question search (search.py): a full-text GIN index for ranked word
+-- matches and a pg_trgm index for substring (ILIKE) matches, both over
+-- the expressions search.py spells out in DOCUMENT and TSVECTOR. To
+-- build them before the app starts on a large table, drop any INVALID
+-- index a failed run left and
+--   psql trivia < migrations/0001_question_search.sql
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_questions_search_tsv ON questions
+  USING gin (to_tsvector('english', coalesce(question, '') || ' ' || coalesce(answer, '')));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_questions_search_trgm ON questions
+  USING gin ((coalesce(question, '') || ' ' || coalesce(answer, '')) gin_trgm_ops);
@@ -0,0 +1,6 @@
+-- Keyset pagination (pagination.py) seeks this index, which the Question
+-- model also declares for databases without migrations. Built
+-- CONCURRENTLY so existing questions stay writable meanwhile; to build
+-- it ahead of a deploy, drop any INVALID leftover of a failed build and
+--   psql trivia < migrations/0002_questions_category_id.sql
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_questions_category_id ON questions (category, id);
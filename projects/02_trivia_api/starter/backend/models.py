@@ -1,5 +1,8 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+import re
+from flask import current_app, has_app_context
+from sqlalchemy import Column, String, Integer, Index, create_engine, event, inspect, text, bindparam
+from sqlalchemy.orm import object_session
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -8,6 +11,11 @@ database_path = "postgres://{}/{}".format('localhost:5432', database_name)
 
 db = SQLAlchemy()
 
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# Advisory lock key letting a single process apply the migrations.
+MIGRATIONS_LOCK = 81730
+CONCURRENT_INDEX = re.compile(r'CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)', re.IGNORECASE)
+
 '''
 setup_db(app)
     binds a flask application and a SQLAlchemy service
@@ -18,6 +26,67 @@ def setup_db(app, database_path=database_path):
     db.app = app
     db.init_app(app)
     db.create_all()
+    create_missing_indexes()
+    apply_migrations()
+
+'''
+create_missing_indexes()
+    create_all() skips tables that already exist, so indexes added to a
+    model after its table was created (e.g. restored from trivia.psql)
+    are created here. Not on Postgres, where a plain CREATE INDEX would
+    block writes to a large table; the migrations build them there.
+'''
+def create_missing_indexes():
+    if db.engine.dialect.name == 'postgresql':
+      return
+    inspector = inspect(db.engine)
+    for table in db.Model.metadata.sorted_tables:
+      existing = set(index['name'] for index in inspector.get_indexes(table.name))
+      for index in table.indexes:
+        if index.name not in existing:
+          index.create(db.engine)
+
+'''
+apply_migrations()
+    on Postgres, runs the statements of every migrations/*.sql file in
+    name order. They are written to be rerun (IF NOT EXISTS) and build
+    indexes CONCURRENTLY, which cannot run in a transaction, so each
+    statement is autocommitted. A concurrent build that fails leaves an
+    INVALID index behind that IF NOT EXISTS would skip forever, so those
+    are dropped before their file runs again. Only the process holding
+    the advisory lock applies them; others starting meanwhile skip them
+    rather than race to build the same indexes.
+'''
+def apply_migrations():
+    if db.engine.dialect.name != 'postgresql':
+      return
+    with db.engine.connect() as connection:
+      connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+      lock = text('SELECT pg_try_advisory_lock(:key)').bindparams(key=MIGRATIONS_LOCK)
+      if not connection.execute(lock).scalar():
+        return
+      try:
+        for name in sorted(os.listdir(MIGRATIONS)):
+          if name.endswith('.sql'):
+            with open(os.path.join(MIGRATIONS, name)) as file:
+              sql = ''.join(line for line in file if not line.lstrip().startswith('--'))
+            drop_invalid_indexes(connection, CONCURRENT_INDEX.findall(sql))
+            for statement in sql.split(';'):
+              if statement.strip():
+                connection.execute(text(statement))
+      finally:
+        connection.execute(text('SELECT pg_advisory_unlock(:key)').bindparams(key=MIGRATIONS_LOCK))
+
+def drop_invalid_indexes(connection, names):
+    if not names:
+      return
+    invalid = connection.execute(text(
+      'SELECT index_class.relname FROM pg_index '
+      'JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid '
+      'WHERE NOT pg_index.indisvalid AND index_class.relname IN :names'
+    ).bindparams(bindparam('names', expanding=True)), {'names': names}).scalars().all()
+    for name in invalid:
+      connection.execute(text('DROP INDEX CONCURRENTLY IF EXISTS %s' % name))
 
 '''
 Question
@@ -25,6 +94,10 @@ Question
 '''
 class Question(db.Model):  
   __tablename__ = 'questions'
+  # Keyset pagination walks questions in (category, id) order.
+  __table_args__ = (
+    Index('ix_questions_category_id', 'category', 'id'),
+  )
 
   id = Column(Integer, primary_key=True)
   question = Column(String)
@@ -58,6 +131,39 @@ class Question(db.Model):
       'difficulty': self.difficulty
     }
 
+'''
+Question changes
+    the (id, category) of every question a transaction inserts or deletes
+    (changing its category or text counts as both) is collected on the
+    session and, once the transaction commits, passed as (inserted,
+    deleted) lists to each callback in the app's 'question_listeners'
+    extension list. Caches derived from the questions table register
+    there; writes that bypass the ORM call notify_question_listeners()
+    themselves.
+'''
+def question_changes(question):
+  return object_session(question).info.setdefault('question_changes', {'inserted': [], 'deleted': []})
+
+def notify_question_listeners(inserted, deleted):
+  for listener in current_app.extensions.get('question_listeners', ()):
+    listener(inserted, deleted)
+
+@event.listens_for(Question, 'after_insert')
+def record_question_insert(mapper, connection, question):
+  question_changes(question)['inserted'].append((question.id, question.category))
+
+@event.listens_for(Question, 'after_delete')
+def record_question_delete(mapper, connection, question):
+  question_changes(question)['deleted'].append((question.id, question.category))
+
+@event.listens_for(Question, 'after_update')
+def record_question_update(mapper, connection, question):
+  attrs = inspect(question).attrs
+  if any(attrs[name].history.deleted for name in ('category', 'question', 'answer')):
+    category = attrs.category.history.deleted or [question.category]
+    question_changes(question)['deleted'].append((question.id, category[0]))
+    question_changes(question)['inserted'].append((question.id, question.category))
+
 '''
 Category
 
@@ -75,4 +181,32 @@ class Category(db.Model):
     return {
       'id': self.id,
       'type': self.type
-    }
\ No newline at end of file
+    }
+
+'''
+Category changes
+    a commit that inserts, updates or deletes categories calls each
+    callback in the app's 'category_listeners' extension list
+'''
+@event.listens_for(Category, 'after_insert')
+@event.listens_for(Category, 'after_update')
+@event.listens_for(Category, 'after_delete')
+def record_category_change(mapper, connection, category):
+  object_session(category).info['categories_changed'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def publish_changes(session):
+  changes = session.info.pop('question_changes', None)
+  categories_changed = session.info.pop('categories_changed', False)
+  if not has_app_context():
+    return
+  if changes:
+    notify_question_listeners(changes['inserted'], changes['deleted'])
+  if categories_changed:
+    for listener in current_app.extensions.get('category_listeners', ()):
+      listener()
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_changes(session):
+  session.info.pop('question_changes', None)
+  session.info.pop('categories_changed', None)
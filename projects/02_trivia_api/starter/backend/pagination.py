@@ -0,0 +1,81 @@
+from sqlalchemy import func
+
+from models import db, Question
+from reloading import Reloading
+
+'''
+encode_cursor(question) / decode_cursor(cursor)
+    a page cursor is the (category, id) of the last question on the page,
+    written as "category:id"
+'''
+def encode_cursor(question):
+  return '%s:%d' % (question.category, question.id)
+
+def decode_cursor(cursor):
+  category, separator, id = cursor.rpartition(':')
+  if not separator:
+    raise ValueError('Malformed cursor %r' % cursor)
+  return category, int(id)
+
+'''
+paginate_questions(per_page, category=None, cursor=None, page=1)
+    one page of questions in (category, id) order, optionally within a
+    category, as (questions, next_cursor). With a cursor the page is read
+    by seeking the (category, id) index past it, so every page costs the
+    same however deep it is; `page` falls back to OFFSET for clients that
+    jump to a page number. next_cursor is None on the last page. A cursor
+    from another category raises ValueError, like a malformed one.
+'''
+def paginate_questions(per_page, category=None, cursor=None, page=1):
+  query = Question.query.order_by(Question.category, Question.id)
+  if category is not None:
+    query = query.filter(Question.category == category)
+  if cursor is None:
+    questions = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+  else:
+    # The rest of the cursor's category, then the categories after it.
+    # SQLite only seeks on the first column of a row value comparison
+    # like (category, id) > (?, ?), so the two ranges are read separately.
+    after_category, after_id = decode_cursor(cursor)
+    if category is not None and after_category != category:
+      raise ValueError('Cursor %r is not in category %s' % (cursor, category))
+    questions = query.filter(Question.category == after_category, Question.id > after_id)\
+      .limit(per_page + 1).all()
+    if len(questions) <= per_page:
+      questions += query.filter(Question.category > after_category)\
+        .limit(per_page + 1 - len(questions)).all()
+  next_cursor = encode_cursor(questions[per_page - 1]) if len(questions) > per_page else None
+  return questions[:per_page], next_cursor
+
+'''
+QuestionCounts
+    the number of questions per category, loaded with one GROUP BY over
+    the (category, id) index. Any committed insert, delete or category
+    change drops the counts; QUESTION_COUNTS_TTL (60 s by default) is
+    kept short since the totals are shown on every page.
+'''
+class QuestionCounts(Reloading):
+
+  def __init__(self, app=None):
+    Reloading.__init__(self)
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('QUESTION_COUNTS_TTL', 60)
+    self.ttl = app.config['QUESTION_COUNTS_TTL']
+    app.extensions['question_counts'] = self
+    app.extensions.setdefault('question_listeners', []).append(self.questions_changed)
+
+  def load(self):
+    rows = db.session.query(Question.category, func.count(Question.id)).group_by(Question.category)
+    return dict(rows.all())
+
+  def total(self, category=None):
+    counts = self.get()
+    if category is None:
+      return sum(counts.values())
+    return counts.get(category, 0)
+
+  def questions_changed(self, inserted, deleted):
+    self.invalidate()
@@ -0,0 +1,141 @@
+import random
+
+from models import db, Question
+from reloading import Reloading
+
+# Random picks tried before a draw falls back to walking the pool.
+DRAW_ATTEMPTS = 8
+
+'''
+IdPool
+    question ids in shuffled order with each id's position, so adding,
+    removing and drawing a random id are all O(1)
+'''
+class IdPool(object):
+
+  def __init__(self, ids=()):
+    self.ids = list(ids)
+    random.shuffle(self.ids)
+    self.positions = dict((id, position) for position, id in enumerate(self.ids))
+
+  def __len__(self):
+    return len(self.ids)
+
+  def add(self, id):
+    if id in self.positions:
+      return
+    # Swap the new id into a random slot to keep the order shuffled.
+    position = random.randint(0, len(self.ids))
+    self.ids.append(id)
+    self.positions[id] = len(self.ids) - 1
+    self.swap(position, len(self.ids) - 1)
+
+  def remove(self, id):
+    position = self.positions.pop(id, None)
+    if position is None:
+      return
+    last = self.ids.pop()
+    if position < len(self.ids):
+      self.ids[position] = last
+      self.positions[last] = position
+
+  def swap(self, a, b):
+    self.ids[a], self.ids[b] = self.ids[b], self.ids[a]
+    self.positions[self.ids[a]] = a
+    self.positions[self.ids[b]] = b
+
+  def draw(self, exclude):
+    '''
+    A random id not in the set `exclude`, or None when there is none left.
+    Random picks are retried a few times, which is O(1) while most of the
+    pool is still unplayed; after that the shuffled pool is walked from a
+    random start, which always finds the remaining ids.
+    '''
+    size = len(self.ids)
+    if size == 0:
+      return None
+    for _ in range(DRAW_ATTEMPTS):
+      id = self.ids[random.randrange(size)]
+      if id not in exclude:
+        return id
+    start = random.randrange(size)
+    for offset in range(size):
+      id = self.ids[(start + offset) % size]
+      if id not in exclude:
+        return id
+    return None
+
+'''
+QuizPool
+    an IdPool per category plus one over all questions, loaded with a
+    single id/category scan. Rather than reloading, commits that insert,
+    delete or recategorize questions move their ids between the pools in
+    place, so only QUIZ_POOL_TTL forces a rescan.
+'''
+class QuizPool(Reloading):
+
+  def __init__(self, app=None):
+    Reloading.__init__(self)
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('QUIZ_POOL_TTL', 300)
+    self.ttl = app.config['QUIZ_POOL_TTL']
+    app.extensions['quiz_pool'] = self
+    app.extensions.setdefault('question_listeners', []).append(self.questions_changed)
+
+  def load(self):
+    ids = {}
+    for id, category in db.session.query(Question.id, Question.category):
+      ids.setdefault(category, []).append(id)
+    pools = dict((category, IdPool(category_ids)) for category, category_ids in ids.items())
+    pools[None] = IdPool(id for category_ids in ids.values() for id in category_ids)
+    return pools
+
+  def draw(self, category=None, previous=frozenset()):
+    '''
+    The id of a random question in `category` (any category when None)
+    whose id is not in the set `previous`, or None when they have all
+    been played.
+    '''
+    pool = self.get().get(category)
+    if pool is None:
+      return None
+    with self.lock:
+      return pool.draw(previous)
+
+  def next_question(self, category=None, previous=()):
+    '''
+    draw() followed by the primary key fetch of the question. A question
+    deleted by another process since the pools loaded is dropped and the
+    draw repeated.
+    '''
+    previous = set(previous)
+    while True:
+      id = self.draw(category, previous)
+      if id is None:
+        return None
+      question = Question.query.get(id)
+      if question is not None:
+        return question
+      self.discard(id)
+      previous.add(id)
+
+  def discard(self, id):
+    with self.lock:
+      for pool in (self.value or {}).values():
+        pool.remove(id)
+
+  def questions_changed(self, inserted, deleted):
+    with self.lock:
+      pools = self.value
+      if pools is None:
+        return
+      for id, category in deleted:
+        for key in (category, None):
+          if key in pools:
+            pools[key].remove(id)
+      for id, category in inserted:
+        pools.setdefault(category, IdPool()).add(id)
+        pools[None].add(id)
@@ -0,0 +1,33 @@
+import time
+from threading import Lock
+
+'''
+Reloading
+    a value built by load() on first use and kept until invalidate() is
+    called or it is older than `ttl` seconds. Invalidation only reaches
+    this process, so `ttl` is also how stale the value may get after
+    writes made by other processes. Subclasses implement load() and set
+    ttl from their app's config.
+'''
+class Reloading(object):
+
+  ttl = 300
+
+  def __init__(self):
+    self.lock = Lock()
+    self.value = None
+    self.loaded_at = 0
+
+  def load(self):
+    raise NotImplementedError
+
+  def get(self):
+    with self.lock:
+      if self.value is None or time.monotonic() - self.loaded_at > self.ttl:
+        self.value = self.load()
+        self.loaded_at = time.monotonic()
+      return self.value
+
+  def invalidate(self):
+    with self.lock:
+      self.value = None
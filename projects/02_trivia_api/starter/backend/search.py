@@ -0,0 +1,144 @@
+import heapq
+import math
+import re
+from threading import Lock
+from sqlalchemy import func, literal_column, or_
+
+from models import db, Question
+
+# The indexed expressions of migrations/0001_question_search.sql, spelled
+# the same way so Postgres matches the queries to the indexes.
+DOCUMENT = "coalesce(questions.question, '') || ' ' || coalesce(questions.answer, '')"
+TSVECTOR = "to_tsvector('english', %s)" % DOCUMENT
+
+WORD = re.compile(r'\w+')
+
+'''
+like_pattern(term)
+    an ILIKE pattern matching `term` anywhere, with its wildcards escaped
+'''
+def like_pattern(term):
+  return '%' + re.sub(r'([\\%_])', r'\\\1', term) + '%'
+
+'''
+InvertedIndex
+    word -> question ids postings over the question and answer text, the
+    search backend for databases without full-text indexes (SQLite). A
+    term matches a question when each of its words is part of some word
+    of the question or answer; matches rank by the summed rarity of their
+    words, with questions containing the whole term first.
+'''
+class InvertedIndex(object):
+
+  def __init__(self):
+    self.documents = {}
+    self.postings = {}
+
+  def add(self, id, text):
+    self.remove(id)
+    text = text.lower()
+    self.documents[id] = text
+    for word in set(WORD.findall(text)):
+      self.postings.setdefault(word, set()).add(id)
+
+  def remove(self, id):
+    text = self.documents.pop(id, None)
+    if text is None:
+      return
+    for word in set(WORD.findall(text)):
+      ids = self.postings[word]
+      ids.discard(id)
+      if not ids:
+        del self.postings[word]
+
+  def search(self, term, limit):
+    '''
+    (ids, total): the ids of the best `limit` questions matching `term`,
+    best first, and the number of questions matching it.
+    '''
+    term = term.lower().strip()
+    words = set(WORD.findall(term))
+    if not words:
+      return [], 0
+    scores = None
+    for word in words:
+      ids = set()
+      for indexed, postings in self.postings.items():
+        if word in indexed:
+          ids.update(postings)
+      weight = math.log(1 + len(self.documents) / float(len(ids) or 1))
+      if scores is None:
+        scores = dict((id, weight) for id in ids)
+      else:
+        scores = dict((id, scores[id] + weight) for id in ids if id in scores)
+      if not scores:
+        return [], 0
+    ranked = heapq.nsmallest(limit, scores, key=lambda id: (term not in self.documents[id], -scores[id], id))
+    return ranked, len(scores)
+
+'''
+QuestionSearch
+    ranked, paginated search over question and answer text. Postgres
+    answers from the full-text index (ranked with ts_rank) together with
+    the trigram index (substring matches); other databases use an
+    InvertedIndex loaded on the first search and kept up to date by the
+    question commits of this process.
+'''
+class QuestionSearch(object):
+
+  def __init__(self, app=None):
+    self.lock = Lock()
+    self.index = None
+    self.pending = set()
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.extensions['question_search'] = self
+    app.extensions.setdefault('question_listeners', []).append(self.questions_changed)
+
+  def search(self, term, per_page, page=1):
+    '''
+    (questions, total) for one page of the questions matching `term`.
+    '''
+    if db.engine.dialect.name == 'postgresql':
+      return self.search_postgres(term, per_page, page)
+    return self.search_index(term, per_page, page)
+
+  def search_postgres(self, term, per_page, page):
+    query = func.plainto_tsquery('english', term)
+    matches = Question.query.filter(or_(
+      literal_column(TSVECTOR).op('@@')(query),
+      literal_column(DOCUMENT).ilike(like_pattern(term), escape='\\')))
+    questions = matches.order_by(func.ts_rank(literal_column(TSVECTOR), query).desc(), Question.id)\
+      .offset((page - 1) * per_page).limit(per_page).all()
+    return questions, matches.count()
+
+  def search_index(self, term, per_page, page):
+    with self.lock:
+      if self.index is None:
+        self.index = InvertedIndex()
+        rows = db.session.query(Question.id, Question.question, Question.answer)
+        self.pending.clear()
+      elif self.pending:
+        rows = db.session.query(Question.id, Question.question, Question.answer)\
+          .filter(Question.id.in_(list(self.pending)))
+        self.pending.clear()
+      else:
+        rows = ()
+      for id, question, answer in rows:
+        self.index.add(id, '%s %s' % (question or '', answer or ''))
+      ids, total = self.index.search(term, page * per_page)
+    page_ids = ids[(page - 1) * per_page:]
+    questions = dict((question.id, question) for question in
+      Question.query.filter(Question.id.in_(page_ids))) if page_ids else {}
+    return [questions[id] for id in page_ids if id in questions], total
+
+  def questions_changed(self, inserted, deleted):
+    with self.lock:
+      if self.index is None:
+        return
+      for id, category in deleted:
+        self.index.remove(id)
+        self.pending.discard(id)
+      self.pending.update(id for id, category in inserted)
@@ -1,10 +1,15 @@
 import os
 import unittest
 import json
+import tempfile
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
-from flaskr import create_app
-from models import setup_db, Question, Category
+from flaskr import create_app, QUESTIONS_PER_PAGE
+from models import setup_db, db, Question, Category
+from loader import load_file
+
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment', 'Sports']
 
 
 class TriviaTestCase(unittest.TestCase):
@@ -12,29 +17,300 @@ class TriviaTestCase(unittest.TestCase):
 
     def setUp(self):
         """Define test variables and initialize app."""
-        self.app = create_app()
-        self.client = self.app.test_client
         self.database_name = "trivia_test"
-        self.database_path = "postgres://{}/{}".format('localhost:5432', self.database_name)
-        setup_db(self.app, self.database_path)
+        # SQLite in memory unless TEST_DATABASE_URL points somewhere else,
+        # e.g. postgresql://localhost:5432/trivia_test
+        self.database_path = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+        self.app = create_app({'DATABASE_PATH': self.database_path})
+        self.client = self.app.test_client
 
         # binds the app to the current context
         with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
-            # create all tables
-            self.db.create_all()
-    
+            db.session.add_all(Category(type) for type in CATEGORIES)
+            db.session.flush()
+            # 25 questions: 5 in each of the first five categories
+            db.session.add_all(
+                Question('Question %d?' % number, 'Answer %d' % number, str(number % 5 + 1), number % 5 + 1)
+                for number in range(25))
+            db.session.commit()
+
     def tearDown(self):
         """Executed after reach test"""
-        pass
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_get_questions(self):
+        res = self.client().get('/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(data['success'])
+        self.assertEqual(len(data['questions']), QUESTIONS_PER_PAGE)
+        self.assertEqual(data['total_questions'], 25)
+        self.assertEqual(data['categories']['1'], 'Science')
+        self.assertEqual(data['questions'][-1]['category'] + ':%d' % data['questions'][-1]['id'],
+            data['next_cursor'])
+
+    def test_follow_question_cursors(self):
+        with self.app.app_context():
+            expected = [question.id for question in Question.query.order_by(Question.category, Question.id)]
+
+        ids = []
+        cursor = ''
+        while cursor is not None:
+            res = self.client().get('/questions?cursor=%s' % cursor if cursor else '/questions')
+            data = json.loads(res.data)
+            self.assertEqual(res.status_code, 200)
+            ids.extend(question['id'] for question in data['questions'])
+            cursor = data['next_cursor']
+
+        self.assertEqual(ids, expected)
+
+    def test_get_questions_page_matches_cursor(self):
+        first = json.loads(self.client().get('/questions').data)
+        by_page = json.loads(self.client().get('/questions?page=2').data)
+        by_cursor = json.loads(self.client().get('/questions?cursor=%s' % first['next_cursor']).data)
+
+        self.assertEqual(by_page['questions'], by_cursor['questions'])
+
+    def test_404_questions_beyond_last_page(self):
+        res = self.client().get('/questions?page=100')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertFalse(data['success'])
+        self.assertEqual(data['message'], 'resource not found')
+
+    def test_400_malformed_cursor(self):
+        res = self.client().get('/questions?cursor=bogus')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(data['success'])
+
+    def test_400_cursor_from_another_category(self):
+        cursor = json.loads(self.client().get('/categories/1/questions').data)['questions'][0]
+        res = self.client().get('/categories/2/questions?cursor=1:%d' % cursor['id'])
+
+        self.assertEqual(res.status_code, 400)
+
+    def test_get_category_questions(self):
+        res = self.client().get('/categories/2/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['current_category'], 'Art')
+        self.assertEqual(data['total_questions'], 5)
+        self.assertEqual(set(question['category'] for question in data['questions']), set(['2']))
+        self.assertIsNone(data['next_cursor'])
+
+    def test_404_questions_of_missing_category(self):
+        res = self.client().get('/categories/1000/questions')
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_question_counts_refresh_after_commit(self):
+        self.client().get('/questions')
+        with self.app.app_context():
+            Question('New question?', 'New answer', '6', 1).insert()
+
+        res = self.client().get('/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(data['total_questions'], 26)
+
+    def test_delete_question(self):
+        res = self.client().delete('/questions/1')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['deleted'], 1)
+        with self.app.app_context():
+            self.assertIsNone(Question.query.get(1))
+
+    def test_404_delete_missing_question(self):
+        res = self.client().delete('/questions/1000')
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_create_question(self):
+        res = self.client().post('/questions', json={'question': 'Why?', 'answer': 'Because',
+            'category': 6, 'difficulty': 2})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(Question.query.get(data['created']).category, '6')
+
+    def test_422_create_question_in_missing_category(self):
+        res = self.client().post('/questions', json={'question': 'Why?', 'answer': 'Because',
+            'category': 1000, 'difficulty': 2})
+
+        self.assertEqual(res.status_code, 422)
+
+    def play(self, category_id, previous):
+        res = self.client().post('/quizzes', json={'previous_questions': previous,
+            'quiz_category': {'type': 'click', 'id': category_id}})
+        self.assertEqual(res.status_code, 200)
+        return json.loads(res.data)['question']
+
+    def test_play_quiz_until_questions_run_out(self):
+        previous = []
+        question = self.play(3, previous)
+        while question is not None:
+            self.assertEqual(question['category'], '3')
+            self.assertNotIn(question['id'], previous)
+            previous.append(question['id'])
+            question = self.play(3, previous)
+
+        self.assertEqual(len(previous), 5)
+
+    def test_play_quiz_in_all_categories(self):
+        with self.app.app_context():
+            ids = [question.id for question in Question.query.all()]
 
-    """
-    TODO
-    Write at least one test for each test for successful operation and for expected errors.
-    """
+        question = self.play(0, ids[1:])
+
+        self.assertEqual(question['id'], ids[0])
+
+    def test_quiz_pool_follows_inserts_and_deletes(self):
+        with self.app.app_context():
+            played = [question.id for question in Question.query.filter_by(category='1')]
+        self.assertIsNotNone(self.play(1, []))
+
+        created = json.loads(self.client().post('/questions', json={'question': 'Why?',
+            'answer': 'Because', 'category': 1, 'difficulty': 2}).data)['created']
+        self.assertEqual(self.play(1, played)['id'], created)
+
+        self.client().delete('/questions/%d' % created)
+        with self.app.app_context():
+            self.assertNotIn(created, self.app.extensions['quiz_pool'].get()['1'].positions)
+        self.assertIsNone(self.play(1, played))
+
+    def test_404_quiz_in_missing_category(self):
+        res = self.client().post('/quizzes', json={'previous_questions': [],
+            'quiz_category': {'type': 'Nope', 'id': 1000}})
+
+        self.assertEqual(res.status_code, 404)
+
+
+    def search(self, term, page=1):
+        res = self.client().post('/questions', json={'searchTerm': term, 'page': page})
+        self.assertEqual(res.status_code, 200)
+        return json.loads(res.data)
+
+    def test_search_questions(self):
+        with self.app.app_context():
+            Question("Whose autobiography is entitled 'I Know Why the Caged Bird Sings'?",
+                'Maya Angelou', '4', 2).insert()
+            Question('Which bird was caged in the title of the film?', 'The canary', '5', 3).insert()
+
+        data = self.search('caged bird')
+
+        self.assertEqual(data['total_questions'], 2)
+        self.assertEqual(data['questions'][0]['answer'], 'Maya Angelou')
+        self.assertEqual(self.search('TITLE')['total_questions'], 2)
+        self.assertEqual(self.search('angelou')['questions'][0]['answer'], 'Maya Angelou')
+
+    def test_search_questions_pages(self):
+        first = self.search('question')
+        last = self.search('question', page=3)
+
+        self.assertEqual(first['total_questions'], 25)
+        self.assertEqual(len(first['questions']), QUESTIONS_PER_PAGE)
+        self.assertEqual(len(last['questions']), 5)
+
+    def test_search_follows_inserts_and_deletes(self):
+        self.assertEqual(self.search('heliotrope')['total_questions'], 0)
+        created = json.loads(self.client().post('/questions', json={'question': 'Heliotrope is a?',
+            'answer': 'Colour', 'category': 2, 'difficulty': 1}).data)['created']
+        self.assertEqual(self.search('heliotrope')['questions'][0]['id'], created)
+
+        self.client().delete('/questions/%d' % created)
+        self.assertEqual(self.search('heliotrope')['total_questions'], 0)
+
+    def test_400_search_without_term(self):
+        res = self.client().post('/questions', json={'searchTerm': None})
+
+        self.assertEqual(res.status_code, 400)
+
+
+    def test_get_categories(self):
+        self.client().get('/categories')
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            res = self.client().get('/categories')
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['categories'], dict((str(id), type) for id, type in enumerate(CATEGORIES, 1)))
+        self.assertEqual(statements, [])
+
+    def test_category_catalog_refresh_after_commit(self):
+        with self.app.app_context():
+            db.session.add(Category('Music'))
+            db.session.commit()
+
+        data = json.loads(self.client().get('/questions').data)
+
+        self.assertEqual(data['categories']['7'], 'Music')
+        self.assertEqual(self.client().get('/categories/7/questions').status_code, 200)
+
+
+    def write_file(self, suffix, content):
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False)
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write(content)
+        return file.name
+
+    def test_load_questions_ndjson(self):
+        path = self.write_file('.ndjson', '\n'.join([
+            json.dumps({'question': 'Loaded %d?' % number, 'answer': 'Yes', 'category': 6, 'difficulty': 1})
+            for number in range(3)] + [
+            json.dumps({'question': 'By type?', 'answer': 'Yes', 'category': 'Sports', 'difficulty': 2}),
+            json.dumps({'question': 'Lost?', 'answer': 'Yes', 'category': 99, 'difficulty': 1}),
+            '{not json']))
+        self.client().post('/quizzes', json={'previous_questions': [], 'quiz_category': {'id': 6}})
+
+        with self.app.app_context():
+            report = load_file(path, batch_size=2)
+
+        self.assertEqual(report['loaded'], 4)
+        self.assertEqual(report['rejected'], 2)
+        self.assertEqual([number for number, message in report['errors']], [5, 6])
+        self.assertEqual(json.loads(self.client().get('/questions').data)['total_questions'], 29)
+        self.assertEqual(self.search('loaded')['total_questions'], 3)
+        self.assertIsNotNone(self.play(6, []))
+
+    def test_load_questions_from_psql_dump(self):
+        with self.app.app_context():
+            report = load_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trivia.psql'))
+            question = Question.query.filter_by(answer='Maya Angelou').one()
+
+        self.assertEqual(report['loaded'], 19)
+        self.assertEqual(question.category, '4')
+
+    def test_load_questions_command(self):
+        path = self.write_file('.csv', 'question,answer,category,difficulty\n'
+            '"What, again?",Again,1,3\nNo answer?,,1,3\n')
+
+        result = self.app.test_cli_runner().invoke(args=['load-questions', path])
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('1 questions', result.output)
+        self.assertIn('1 rejected', result.output)
+        with self.app.app_context():
+            self.assertEqual(Question.query.filter_by(answer='Again').one().question, 'What, again?')
 
 
 # Make the tests conveniently executable
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()